@@ -1,7 +1,6 @@
-from .gcc import GCCToolkit
-from .msvc import MSVCToolkit
-from .oneapi import OneAPIToolkit
-from .presets import generate_presets_file
+from importlib import import_module
+from typing import Any, List
+
 from .toolkit import (
     BatScriptToolkit,
     ShellScriptToolkit,
@@ -21,3 +20,23 @@ __all__ = [
     "generate_presets_file",
     "get_toolkits",
 ]
+
+# Attributes whose module is imported on first access
+_LAZY_ATTRS = {
+    "GCCToolkit": ".gcc",
+    "MSVCToolkit": ".msvc",
+    "OneAPIToolkit": ".oneapi",
+    "generate_presets_file": ".presets",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_ATTRS:
+        attr = getattr(import_module(_LAZY_ATTRS[name], __name__), name)
+        globals()[name] = attr
+        return attr
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> List[str]:
+    return sorted(globals().keys() | _LAZY_ATTRS.keys())
@@ -0,0 +1,83 @@
+import atexit
+import logging
+import sys
+from functools import lru_cache
+from logging.handlers import MemoryHandler
+from typing import Union
+
+
+class CLIFormatter(logging.Formatter):
+    # Windows 10 added ANSI color support so let's assume this is okay.
+    # 256 color should be perfectly fine as well
+    # fmt: off
+    WHITE       = "\x1b[0;37m"
+    YELLOW      = "\x1b[0;33m"
+    RED         = "\x1b[0;31m"
+    BOLD_RED    = "\x1b[1;31m"
+    RESET       = "\x1b[0m"
+    CYAN        = "\x1b[0;36m"
+    SEP         = WHITE + ":" + RESET
+
+    # Level prefix templates, formatted with the attributes of the record
+    DEBUG       = f"{WHITE}%(levelname)s - {CYAN}%(name)s{RESET}{SEP} "
+    INFO        = ""
+    WARNING     = f"{YELLOW}%(levelname)s{RESET}{SEP} "
+    ERROR       = f"{RED}%(levelname)s{RESET}{SEP} "
+    CRITICAL    = f"{BOLD_RED}%(levelname)s{RESET}{SEP} "
+    # fmt: on
+
+    def __init__(self) -> None:
+        super().__init__("%(message)s", style="%")
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        prefix = CLIFormatter.get_prefix(record.levelno)
+        return prefix % record.__dict__ + message if prefix else message
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def get_prefix(levelno: int) -> str:
+        """Return prefix template for any level"""
+        if levelno <= logging.DEBUG:
+            return CLIFormatter.DEBUG
+        elif levelno <= logging.INFO:
+            return CLIFormatter.INFO
+        elif levelno <= logging.WARNING:
+            return CLIFormatter.WARNING
+        elif levelno <= logging.ERROR:
+            return CLIFormatter.ERROR
+        return CLIFormatter.CRITICAL
+
+
+_CLI_FORMATTER = CLIFormatter()
+_CLI_HANDLER: Union[logging.Handler, None] = None
+
+
+def setup_cli_logging() -> logging.Logger:
+    """Add CLI handler to package logger. Repeated calls will not add handlers"""
+    global _CLI_HANDLER
+    log = logging.getLogger(__package__)
+    if _CLI_HANDLER is not None and _CLI_HANDLER in log.handlers:
+        log.setLevel(logging.INFO)
+        return log
+
+    interactive = sys.stdout.isatty()
+    if hasattr(sys.stdout, "reconfigure"):  # Python 3.7+ and not replaced
+        # Line buffered for terminal, else block buffered
+        sys.stdout.reconfigure(line_buffering=interactive, write_through=False)
+    atexit.register(sys.stdout.flush)  # Registered first, so runs last
+
+    ch = logging.StreamHandler(sys.stdout)
+    ch.setFormatter(_CLI_FORMATTER)
+
+    handler: logging.Handler = ch
+    if not interactive:
+        # Batch writes to pipe or file. Interactive output is kept live
+        handler = MemoryHandler(capacity=1024, flushLevel=logging.ERROR, target=ch)
+        atexit.register(handler.flush)
+
+    _CLI_HANDLER = handler
+    log.addHandler(handler)
+    log.setLevel(logging.INFO)
+
+    return log
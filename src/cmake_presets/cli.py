@@ -1,150 +1,166 @@
 import logging
 import sys
 from argparse import ArgumentParser, Namespace, RawTextHelpFormatter
-from inspect import isabstract
-from typing import Dict, Union
-
-from .toolkit import ToolkitError, get_toolkits
-
-
-class CLIFormatter(logging.Formatter):
-    # Windows 10 added ANSI color support so let's assume this is okay.
-    # 256 color should be perfectly fine as well
-    # fmt: off
-    WHITE       = "\x1b[0;37m"
-    YELLOW      = "\x1b[0;33m"
-    RED         = "\x1b[0;31m"
-    BOLD_RED    = "\x1b[1;31m"
-    RESET       = "\x1b[0m"
-    CYAN        = "\x1b[0;36m"
-    SEP         = WHITE + ":" + RESET
-    # fmt: on
-
-    DEBUG = logging.Formatter(
-        f"{WHITE}%(levelname)s - {CYAN}%(name)s{RESET}{SEP} %(message)s"
-    )
-    INFO = logging.Formatter("%(message)s")
-    WARNING = logging.Formatter(f"{YELLOW}%(levelname)s{RESET}{SEP} %(message)s")
-    ERROR = logging.Formatter(f"{RED}%(levelname)s{RESET}{SEP} %(message)s")
-    CRITICAL = logging.Formatter(f"{BOLD_RED}%(levelname)s{RESET}{SEP} %(message)s")
-
-    def __init__(self) -> None:
-        super().__init__(style="%")
-
-    def format(self, record: logging.LogRecord) -> str:
-        if record.levelno <= logging.DEBUG:
-            return CLIFormatter.DEBUG.format(record)
-        elif record.levelno <= logging.INFO:
-            return CLIFormatter.INFO.format(record)
-        elif record.levelno <= logging.WARNING:
-            return CLIFormatter.WARNING.format(record)
-        elif record.levelno <= logging.ERROR:
-            return CLIFormatter.ERROR.format(record)
-        else:
-            return CLIFormatter.CRITICAL.format(record)
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, NamedTuple, Tuple
 
+from .toolkit import Toolkit, ToolkitError, get_toolkits
 
-def setup_cli_logging() -> logging.Logger:
-    ch = logging.StreamHandler(sys.stdout)
-    # ch.setLevel(logging.DEBUG)
-    ch.setFormatter(CLIFormatter())
+_HELP_SECTIONS = {
+    "version": """Arguments that takes VER argument.
 
-    log = logging.getLogger(__package__)
-    log.addHandler(ch)
-    log.setLevel(logging.INFO)
+Version specification can be in the following forms (V = Version):
+    V or =V or eqV      equal to V
+    <V or ltV           less than V
+    <= or lteV          less or equal to V
+    >V or gtV           greater than V
+    >=V or gteV         greater or equal to V
 
-    return log
+Ranges:
+    VER1,VER2           two specifications of above which both needs to match.
+                        can be used to define a range
+    rangeV              A version range based on smallest number
+                        range2.3  becomes >=2.3,<2.4
+
+Version is defined in form major.minor.patch.revision, where major is required,
+all parts are non-negative and at least one part is non-zero.
+
+Version comparison will pad the shortest version with zeroes so that comparison
+of 2.5 and 2.5.1 will be the comparison of 2.5.0 and 2.5.1. This means that 2.5
+is not equal to 2.5.1. If the intent is to match a range 2.5 - 2.6, then the range
+specifier range2.5 will accept all version 2.5.0 up to, but excluding, 2.6.0
+"""
+}
+_HELP_CMDS = ("scan", "filter", "select", "generate")
+_ALL_SECTIONS = tuple(_HELP_SECTIONS) + _HELP_CMDS
+_SECTIONS_STR = ", ".join(_ALL_SECTIONS)
+_SCAN_CMDS = frozenset({"scan", "filter", "select"})
+
+
+# Sub-command aliases, used to find the command before parsing arguments
+_ALIASES = {
+    "l": "list",
+    "s": "scan",
+    "f": "filter",
+    "sel": "select",
+    "gen": "generate",
+}
+
+
+def _peek_command(argv: List[str]) -> str:
+    """Return the sub-command name from command-line without parsing it"""
+    for arg in argv:
+        if not arg.startswith("-"):
+            return _ALIASES.get(arg, arg)
+    return ""
+
+
+class ActiveToolkit(NamedTuple):
+    name: str  # Registered class name
+    cls: Toolkit
+    prefix: str  # Argument prefix
+    title: str  # Human readable name
+
+
+def _get_active_toolkits(toolkits: Dict[str, Toolkit]) -> List[ActiveToolkit]:
+    """Return toolkits, sorted by name, that are supported and take arguments"""
+    active = []
+    for name, cls in sorted(toolkits.items()):
+        if cls._is_abstract or not cls.is_supported():
+            continue
+        prefix = cls._get_argument_prefix()
+        if prefix:
+            active.append(ActiveToolkit(name, cls, prefix, cls.get_toolkit_name()))
+    return active
+
+
+def _add_toolkit_arguments(parser: ArgumentParser) -> None:
+    """Add argument groups of all active toolkits to parser"""
+    for _, cls, prefix, title in _get_active_toolkits(get_toolkits()):
+        group = parser.add_argument_group(title + " options")
+        # TODO Wrap group in a Callable that interfers and force prefix
+        cls._add_arguments(prefix, group)
+
+
+def _scan_toolkit(args: Namespace, cls: Toolkit, prefix: str) -> Tuple[Toolkit, bool]:
+    """Construct toolkit from arguments and run scan according to command"""
+    # TODO extract args only for this toolkit according to prefix
+    if args.cmd == "select":
+        toolkit = cls._from_args(prefix, args)
+        okay = toolkit.scan_select() > 0
+    elif args.cmd == "filter":
+        toolkit = cls._from_args(prefix, args)
+        okay = toolkit.scan_filter() > 0
+    else:
+        toolkit = cls._from_args(prefix, None)
+        okay = toolkit.scan() > 0
+    return toolkit, okay
 
 
-def _scan_common(log: logging.Logger, args: Namespace) -> None:
+def _scan_common(
+    log: logging.Logger,
+    args: Namespace,
+    toolkits: Dict[str, Toolkit],
+    active: List[ActiveToolkit],
+) -> None:
     if args.debug:
         log.setLevel(logging.DEBUG)
 
     if args.cmd == "list":
+        if not log.isEnabledFor(logging.INFO):
+            return
         log.info("Toolkits:")
-        for cls in get_toolkits().values():
-            if args.verbose or cls.is_supported():
-                suffix = (
-                    "" if cls.is_supported() else " - not supported on this platform"
-                )
+        for cls in toolkits.values():
+            supported = cls.is_supported()
+            if args.verbose or supported:
+                suffix = "" if supported else " - not supported on this platform"
                 log.info(" * %s%s", cls.get_toolkit_name(), suffix)
-    elif args.cmd in ["scan", "filter", "select"]:
-        for name, cls in get_toolkits().items():
-            if not cls.is_supported():
-                continue
-            prefix = cls._get_argument_prefix()
-            if not prefix:
-                continue
+    elif args.cmd in _SCAN_CMDS:
+        # Scans are I/O bound. Run them concurrently but print in order
+        with ThreadPoolExecutor(max_workers=max(1, len(active))) as executor:
+            futures = [
+                executor.submit(_scan_toolkit, args, tk.cls, tk.prefix) for tk in active
+            ]
+        for (name, _, _, title), future in zip(active, futures):
             try:
-                # TODO extract args only for this toolkit according to prefix
-                if args.cmd == "select":
-                    toolkit = cls._from_args(prefix, args)
-                    okay = toolkit.scan_select() > 0
-                elif args.cmd == "filter":
-                    toolkit = cls._from_args(prefix, args)
-                    okay = toolkit.scan_filter() > 0
-                else:
-                    toolkit = cls._from_args(prefix, None)
-                    okay = toolkit.scan() > 0
+                toolkit, okay = future.result()
                 if okay:
                     toolkit.print(detailed=args.verbose)
                 else:
-                    log.info("No instances found for %s", toolkit.get_toolkit_name())
+                    log.info("No instances found for %s", title)
             except ToolkitError as e:
                 if args.skip_bad:
                     log.warning("Skipping toolkit %s due to error:\n{%s}", name, str(e))
                 else:
+                    for handler in log.handlers:
+                        handler.flush()  # Output before traceback
                     raise e
 
 
 def main() -> None:
-    log = setup_cli_logging()
-
-    help_sections = {
-        "version": """Arguments that takes VER argument.
-
-Version specification can be in the following forms (V = Version):
-    V or =V or eqV      equal to V
-    <V or ltV           less than V
-    <= or lteV          less or equal to V
-    >V or gtV           greater than V
-    >=V or gteV         greater or equal to V
-
-Ranges:
-    VER1,VER2           two specifications of above which both needs to match.
-                        can be used to define a range
-    rangeV              A version range based on smallest number
-                        range2.3  becomes >=2.3,<2.4
+    from ._logging import setup_cli_logging  # Only needed when run as CLI
 
-Version is defined in form major.minor.patch.revision, where major is required,
-all parts are non-negative and at least one part is non-zero.
+    log = setup_cli_logging()
 
-Version comparison will pad the shortest version with zeroes so that comparison
-of 2.5 and 2.5.1 will be the comparison of 2.5.0 and 2.5.1. This means that 2.5
-is not equal to 2.5.1. If the intent is to match a range 2.5 - 2.6, then the range
-specifier range2.5 will accept all version 2.5.0 up to, but excluding, 2.6.0
-"""
-    }
-    help_cmds: Dict["str", Union[None, ArgumentParser]] = {
-        "scan": None,
-        "filter": None,
-        "select": None,
-        "generate": None,
-    }
-    all_sections = help_sections.keys() | help_cmds.keys()
+    help_cmds: Dict[str, ArgumentParser] = {}
 
     parser = ArgumentParser(prog=__package__)
     sub = parser.add_subparsers(required=True, dest="cmd")
 
-    sub.add_parser("list", aliases="l")
+    lst = sub.add_parser("list", aliases=["l"], help="list toolkits")
+    lst.add_argument(
+        "-v", "--verbose", action="store_true", help="include unsupported toolkits"
+    )
+    lst.add_argument("--debug", action="store_true", help="show debug messages")
     help = sub.add_parser("help", help="show help section", add_help=False)
     help.add_argument(
         "section",
         metavar="SECTION",
         nargs="?",
         default=None,
-        choices=[str(key) for key in all_sections],
-        help=f"show help and exit. possible sections: {', '.join(all_sections)}",
+        choices=_ALL_SECTIONS,
+        help=f"show help and exit. possible sections: {_SECTIONS_STR}",
     )
     scan = sub.add_parser("scan", aliases=["s"], help="scan and list all toolkits")
     filter = sub.add_parser(
@@ -160,7 +176,10 @@ specifier range2.5 will accept all version 2.5.0 up to, but excluding, 2.6.0
     help_cmds["select"] = select
     help_cmds["generate"] = generate
 
-    for p in [scan, filter, select, generate]:
+    # Toolkit arguments are only added to the sub-command actually used, so
+    # toolkit modules are not imported for help of other commands
+    populate: Dict[str, Callable[[], None]] = {}
+    for name, p in help_cmds.items():
         p.add_argument(
             "--skip-bad", action="store_true", help="report toolkit error but continue"
         )
@@ -171,37 +190,38 @@ specifier range2.5 will accept all version 2.5.0 up to, but excluding, 2.6.0
 
         if p == scan:
             continue
+        populate[name] = partial(_add_toolkit_arguments, p)
 
-        for cls in get_toolkits().values():
-            if isabstract(cls) or not cls.is_supported():
-                continue
-            prefix = cls._get_argument_prefix()
-            if prefix:
-                group = p.add_argument_group(cls.get_toolkit_name() + " options")
-                # TODO Wrap group in a Callable that interfers and force prefix
-                cls._add_arguments(prefix, group)
+    cmd = _peek_command(sys.argv[1:])
+    if cmd in populate:
+        populate.pop(cmd)()
 
     args = parser.parse_args()
+    args.cmd = _ALIASES.get(args.cmd, args.cmd)
 
     if "cmd" not in args:
         if args.help_version:
-            print(help_sections["version"])
+            print(_HELP_SECTIONS["version"])
             sys.exit(0)
 
     if args.cmd == "help":
         if args.section:
-            if args.section in help_sections:
-                print(help_sections[args.section])
-            elif help_cmds[args.section] is not None:
-                help_cmds[args.section].print_help()  # type: ignore
+            if args.section in _HELP_SECTIONS:
+                print(_HELP_SECTIONS[args.section])
+            elif args.section in populate:
+                populate.pop(args.section)()
+                help_cmds[args.section].print_help()
+            elif args.section in help_cmds:
+                help_cmds[args.section].print_help()
             else:
                 log.error("unhandled section: %s", args.section)
         else:
             help.print_help()
         sys.exit(0)
 
-    if args.cmd in ["scan", "filter", "select"]:
-        _scan_common(log, args)
+    if args.cmd == "list" or args.cmd in _SCAN_CMDS:
+        toolkits = get_toolkits()
+        _scan_common(log, args, toolkits, _get_active_toolkits(toolkits))
     else:
         log.error("generate not implemented")
 
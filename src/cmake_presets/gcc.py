@@ -1,11 +1,12 @@
+import json
 import logging
 import os
 import platform
 import re
 import subprocess
-from argparse import Namespace, _ArgumentGroup
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from functools import total_ordering
-from typing import Any, Dict, List, Set, TypeVar, Union
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Set, Tuple, TypeVar, Union
 
 from .toolkit import Toolkit
 from .util import (
@@ -13,14 +14,21 @@ from .util import (
     ScanError,
     Version,
     VersionSpec,
+    expand_dir,
     expand_dirs,
+    is_exec_stat,
     override,  # Compatibility imports
 )
 
+if TYPE_CHECKING:  # argparse is only needed by the command line interface
+    from argparse import Namespace, _ArgumentGroup
+
 log = logging.getLogger(__name__)
 GCCType = TypeVar("GCCType", bound="GCC")
 GCCToolkitType = TypeVar("GCCToolkitType", bound="GCCToolkit")
 
+_IS_LINUX = platform.system() == "Linux"
+
 
 def gcc_version(val: Union[str, VersionSpec]) -> VersionSpec:
     return VersionSpec.make(val)  # Care about length?
@@ -47,49 +55,339 @@ def gcc_version(val: Union[str, VersionSpec]) -> VersionSpec:
 #      Result may look strange to users... We might reconsider
 # ---------------------------------------------------------------------------- #
 
-_SYSTEM = r"^([a-zA-Z0-9_]+-[a-zA-Z0-9_\-]+-)?"
+# Machine parts are separated by single dashes to avoid ambiguous backtracking
+_SYSTEM = r"\A([a-zA-Z0-9_]+(?:-[a-zA-Z0-9_]+)+-)?"
 _NAME = r"(gcc|g\+\+|gfortran)"
-_VERSION = r"(-[0-9\.]+)?$"
-re_bin = re.compile(_SYSTEM + _NAME + _VERSION)
+_VERSION = r"(-[0-9\.]+)?\Z"
+re_bin = re.compile(_SYSTEM + _NAME + _VERSION, re.ASCII)
+_match_bin = re_bin.match  # Bound once, called for each candidate file
+
+# Full version as reported by "gcc version X" from -v, which also identifies GCC
+re_version = re.compile(r"\A[0-9]+(?:\.[0-9]+){2,3}\Z", re.ASCII)
+
+_NAME_IDX = {"gcc": 0, "g++": 1, "gfortran": 2}  # Index in GccCollection values
 
 # Construct map of findings
 # dir -> fn_id -> [gcc_fn, gxx_fn, gfortran_fn]
 # Where: fn_id = '_' + machine + ver (from filename only)
 GccCollection = Dict[str, Dict[str, List[str]]]
 
+# Number of directories listed or binaries probed concurrently
+_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+_PROBE_TIMEOUT = 10  # Seconds, a hanging binary must not stall the scan
+
+# What a toolkit scan is complete for, each includes the ones before
+_SCAN_SELECT = 0
+_SCAN_FILTER = 1
+_SCAN_ALL = 2
+
+# Environment hints to skip the directory scan. Either an installation root
+# containing bin, or explicit compiler paths where C++ and Fortran are optional
+_HINT_ROOT = "CMAKE_PRESETS_GCC_ROOT"
+_HINT_BINS = ("CMAKE_PRESETS_GCC_CC", "CMAKE_PRESETS_GCC_CXX", "CMAKE_PRESETS_GCC_FC")
+_HINT_ID = "hint"  # fn_id of explicit compiler paths, not checked by a scan
+
+# Binaries to probe as (dir, [gcc, g++, gfortran], names_checked) where
+# names_checked tells if the names were found executable by a directory scan
+Candidate = Tuple[str, List[str], bool]
+
+# Probe results on disk
+# path -> [st_mtime_ns, st_size, version string, machine]
+ProbeCache = Dict[str, List[Any]]
+
+
+# Probe results of this process by (st_dev, st_ino, st_mtime_ns, st_size), so
+# hard linked binaries and repeated scans run each binary only once
+_PROBED: Dict[Tuple[int, int, int, int], Tuple[str, str]] = {}
+
+
+# Directory snapshot on disk of the last scan, valid while the roots are the
+# same, no listed directory has a changed mtime (entries added or removed) and
+# no binary matching by name has a changed mtime or mode (rewritten or chmod)
+# {"roots": [root, ...], "dirs": {path: st_mtime_ns},
+#  "bins": {path: [st_mtime_ns, st_mode]}, "found": GccCollection}
+DirSnapshot = Dict[str, Any]
 
-def _scandir(path: str, dest: GccCollection) -> None:
+# Set to neither read nor write cached scan and probe results
+_NO_CACHE = "CMAKE_PRESETS_NOCACHE"
+
+
+def _cache_file(name: str = "gcc_scan.json") -> str:
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_dir, "cmake-presets", name)
+
+
+def _read_cache_file(name: str) -> Any:
+    if os.environ.get(_NO_CACHE):
+        return None
+    try:
+        with open(_cache_file(name), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache_file(name: str, data: Any) -> None:
+    if os.environ.get(_NO_CACHE):
+        return
+    fn = _cache_file(name)
+    try:
+        os.makedirs(os.path.dirname(fn), exist_ok=True)
+        tmp = f"{fn}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, fn)
+    except OSError as e:
+        log.debug("Could not write GCC cache %s: %s", fn, e)
+
+
+def _load_cache() -> ProbeCache:
+    """Load probe cache, dropping entries of binaries that no longer exist"""
+    data = _read_cache_file("gcc_scan.json")
+    if not isinstance(data, dict):
+        return {}
+    return {
+        path: val
+        for path, val in data.items()
+        if isinstance(val, list) and len(val) == 4 and os.path.exists(path)
+    }
+
+
+def _save_cache(cache: ProbeCache) -> None:
+    _write_cache_file("gcc_scan.json", cache)
+
+
+def _load_snapshot(roots: List[str]) -> Union[GccCollection, None]:
+    """Found binaries of last scan of same roots if no directory changed since"""
+    data = _read_cache_file("gcc_dirs.json")
+    if not isinstance(data, dict) or data.get("roots") != sorted(roots):
+        return None
+    try:
+        for path, mtime in data["dirs"].items():
+            if os.stat(path).st_mtime_ns != mtime:
+                log.debug("Changed since last scan: %s", path)
+                return None
+        for path, (mtime, mode) in data["bins"].items():
+            st = os.stat(path, follow_symlinks=False)
+            if st.st_mtime_ns != mtime or st.st_mode != mode:
+                log.debug("Changed since last scan: %s", path)
+                return None
+        found: GccCollection = data["found"]
+    except (OSError, KeyError, AttributeError, TypeError, ValueError):
+        return None
+    return found
+
+
+def _save_snapshot(
+    roots: List[str],
+    dirs: Dict[str, int],
+    bins: Dict[str, List[int]],
+    found: GccCollection,
+) -> None:
+    data: DirSnapshot = {
+        "roots": sorted(roots),
+        "dirs": dirs,
+        "bins": bins,
+        "found": found,
+    }
+    _write_cache_file("gcc_dirs.json", data)
+
+
+# Directory names that cannot lead to a GCC installation, pruned at any depth.
+# Generic names like src or lib are scanned, toolchains are built under them
+_SKIP_DIRS = frozenset(
+    {
+        ".git",
+        ".svn",
+        "__pycache__",
+        "node_modules",
+        ".cache",
+        ".venv",
+        "include",
+        "snap",
+        ".npm",
+        ".cargo",
+        ".rustup",
+        "Trash",
+    }
+)
+_MAX_DEPTH = 8  # Levels below each scanned directory
+
+
+# Subdirectories as (key, path, depth, in_bin, mtime), binaries as
+# (fn, fn_id, index) and (path, mtime, mode) of all files matching by name,
+# executable or not, found by listing a single directory
+DirListing = Tuple[
+    List[Tuple[Tuple[int, int], str, int, bool, int]],
+    List[Tuple[str, str, int]],
+    List[Tuple[str, int, int]],
+]
+
+
+def _list_dir(path: str, depth: int, in_bin: bool) -> DirListing:
+    """List a single directory for subdirectories to descend into and for
+    binaries if it is a bin directory. Safe to run from worker threads
+    """
+    subdirs: List[Tuple[Tuple[int, int], str, int, bool, int]] = []
+    binaries: List[Tuple[str, str, int]] = []
+    stats: List[Tuple[str, int, int]] = []
+    descend = depth < _MAX_DEPTH
+    last = depth + 1 >= _MAX_DEPTH  # Subdirectories only listed if bin
     try:
-        in_bin = os.path.basename(path) == "bin"
         with os.scandir(path) as it:
             for entry in it:
-                if entry.is_dir(follow_symlinks=False):
-                    _scandir(entry.path, dest)
-                elif in_bin and entry.is_file(follow_symlinks=False):
-                    m = re_bin.match(entry.name)
-                    if not m:
+                fn = entry.name
+                # File type checks use d_type where possible, so test for files
+                # only in bin directories and name filters before is_dir
+                if in_bin and entry.is_file(follow_symlinks=False):
+                    # Cheap test before regex since most files will not match
+                    if "gcc" not in fn and "g++" not in fn and "gfortran" not in fn:
                         continue
-                    machine = m.group(1)
-                    name = m.group(2)
-                    version = m.group(3)
-
+                    m = _match_bin(fn)
+                    if m is None:
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                    stats.append((entry.path, st.st_mtime_ns, st.st_mode))
+                    # Skip stubs without any executable bit before probing
+                    if not is_exec_stat(st):
+                        log.debug("Not executable: %s", entry.path)
+                        continue
+                    machine, name, version = m.group(1, 2, 3)
                     fn_id = str(machine) + str(version)  # OK with "NoneNone"
-                    if path not in dest:
-                        dest[path] = {}
-                    if fn_id not in dest[path]:
-                        dest[path][fn_id] = ["", "", ""]
-                    idx = ["gcc", "g++", "gfortran"].index(name)
-                    if idx < 0:
-                        log.debug("Unexpected binary matched: %s", entry.name)
-                    else:
-                        dest[path][fn_id][idx] = entry.name
+                    binaries.append((fn, fn_id, _NAME_IDX[name]))
+                elif descend and fn not in _SKIP_DIRS and entry.is_dir():
+                    is_bin = fn == "bin"
+                    if last and not is_bin:
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    subdirs.append(
+                        (
+                            (st.st_dev, st.st_ino),
+                            entry.path,
+                            depth + 1,
+                            is_bin,
+                            st.st_mtime_ns,
+                        )
+                    )
 
     except PermissionError:
         log.warning("No permissions to scan: %s", path)
+    except FileNotFoundError:
+        log.debug("Broken link: %s", path)
+    return subdirs, binaries, stats
+
+
+def _scandir(
+    root: Union[str, List[str]],
+    dest: GccCollection,
+    visited: Union[Set[Tuple[int, int]], None] = None,
+    executor: Union[ThreadPoolExecutor, None] = None,
+    listed: Union[Dict[str, int], None] = None,
+    bins: Union[Dict[str, List[int]], None] = None,
+) -> None:
+    """Scan root(s) for binaries in any bin directory. Symlinked directories are
+    followed but each physical directory, identified by (st_dev, st_ino) in
+    visited, is only scanned once
+
+    Directories are listed concurrently when an executor is given, as listing
+    is mostly waiting on the file system. Bookkeeping of visited and dest is
+    only done by the calling thread so no locking is needed. The mtime of each
+    listed directory is added to listed and the [mtime, mode] of each file
+    matching by name to bins, if given
+
+    Not os.walk since it only yields names, losing the DirEntry needed to skip
+    symlinked files and check the executable bit without another stat
+    """
+    if visited is None:
+        visited = set()
+    if listed is None:
+        listed = {}
+    if bins is None:
+        bins = {}
+    pending: List[Tuple[str, int, bool]] = []
+    mtimes: Dict[str, int] = {}
+    for path in [root] if isinstance(root, str) else root:
+        try:
+            st = os.stat(path)
+        except OSError:
+            log.debug("Broken link: %s", path)
+            continue
+        key = (st.st_dev, st.st_ino)
+        if key not in visited:
+            visited.add(key)
+            mtimes[path] = st.st_mtime_ns
+            pending.append((path, 0, os.path.basename(path) == "bin"))
+
+    def record(path: str, listing: DirListing) -> None:
+        listed[path] = mtimes.pop(path)
+        subdirs, binaries, stats = listing
+        for fn, mtime, mode in stats:
+            bins[fn] = [mtime, mode]
+        if binaries:
+            found = dest.setdefault(path, {})
+            for fn, fn_id, idx in binaries:
+                found.setdefault(fn_id, ["", "", ""])[idx] = fn
+        # Directories are deduplicated before being queued, using the stat
+        # cached on the DirEntry, so repeated paths are never listed again
+        for key, subpath, depth, in_bin, mtime in subdirs:
+            if key not in visited:
+                visited.add(key)
+                mtimes[subpath] = mtime
+                pending.append((subpath, depth, in_bin))
+
+    if executor is None:
+        while pending:
+            path, depth, in_bin = pending.pop()
+            record(path, _list_dir(path, depth, in_bin))
+        return
+
+    futures: Dict[Future, str] = {}
+    while pending or futures:
+        while pending:
+            path, depth, in_bin = pending.pop()
+            futures[executor.submit(_list_dir, path, depth, in_bin)] = path
+        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        for future in done:
+            record(futures.pop(future), future.result())
+
+
+def _scan_hint() -> GccCollection:
+    """Binaries given by environment variables, if any, without a full scan.
+    Explicit compiler paths take precedence over an installation root
+    """
+    found: GccCollection = {}
+    cc, cxx, fc = (os.environ.get(var, "") for var in _HINT_BINS)
+    if cc:
+        dir, gcc = os.path.split(expand_dir(cc))
+        names = [gcc, "", ""]
+        for idx, fn in ((1, cxx), (2, fc)):
+            if not fn:
+                continue
+            fdir, name = os.path.split(expand_dir(fn))
+            if fdir != dir:
+                log.warning("Ignoring %s not in same directory as %s", fn, cc)
+                continue
+            names[idx] = name
+        found[dir] = {_HINT_ID: names}
+        return found
+
+    root = os.environ.get(_HINT_ROOT)
+    if root:
+        bindir = os.path.join(expand_dir(root), "bin")
+        if os.path.isdir(bindir):
+            _scandir(bindir, dest=found)
+        else:
+            log.warning("No bin directory in %s=%s", _HINT_ROOT, root)
+    return found
 
 
 @total_ordering
 class GCC:
+    __slots__ = ("version", "machine", "gfortran", "dir", "gcc", "gxx")
+
     def __init__(self, dir: str) -> None:
         self.dir: str = dir
         self.gcc: str = ""
@@ -100,40 +398,37 @@ class GCC:
 
     def gcc_path(self) -> str:
         if self.gcc:
-            return os.path.join(self.dir, self.gcc)
+            return f"{self.dir}{os.sep}{self.gcc}"
         return ""
 
     def gxx_path(self) -> str:
-        if self.gcc:
-            return os.path.join(self.dir, self.gxx)
+        if self.gxx:
+            return f"{self.dir}{os.sep}{self.gxx}"
         return ""
 
     def gfortran_path(self) -> str:
-        if self.gcc:
-            return os.path.join(self.dir, self.gfortran)
+        if self.gfortran:
+            return f"{self.dir}{os.sep}{self.gfortran}"
         return ""
 
+    def sort_key(self) -> Tuple[Tuple[int, ...], str, bool]:
+        """Ordering by version, machine and then Fortran availability. Version
+        parts are compared as a plain tuple, same as full Version comparison
+        """
+        return (self.version.parts, self.machine, bool(self.gfortran))
+
     def __lt__(self, other: Any) -> bool:
         if not isinstance(other, GCC):
             return False
-        if self.version != other.version:
-            return self.version < other.version
-        if self.machine != other.machine:
-            return self.machine < other.machine
-        if bool(self.gfortran) != bool(other.gfortran):
-            if other.gfortran:
-                return True
-            return False
-        return False  # Equal
+        return self.sort_key() < other.sort_key()
 
     def __eq__(self, other: Any) -> bool:
         if not isinstance(other, GCC):
             return False
-        return (
-            self.version == other.version
-            and self.machine == other.machine
-            and bool(self.gfortran) == bool(other.gfortran)
-        )
+        return self.sort_key() == other.sort_key()
+
+    def __hash__(self) -> int:
+        return hash(self.sort_key())
 
     def print(
         self, detailed: bool = False, cxx: bool = True, fortran: bool = True
@@ -166,62 +461,139 @@ class GCC:
         gxx: Union[str, None],
         gfortran: Union[str, None],
         test: bool = False,
+        cache: Union[ProbeCache, None] = None,
+        spec: Union[VersionSpec, None] = None,
+        trust_names: bool = False,
     ) -> bool:
+        """With trust_names, siblings found executable by a directory scan are not
+        run if their names tell the machine and version gcc proved to have
+        """
         if test:
-            if not self.test_bin(gcc):
+            if not self.test_bin(gcc, cache):
                 return False
-            if not self.test_bin(gxx):
-                gxx = ""
-            if not self.test_bin(gfortran):
-                gfortran = ""
+            if spec is not None and not spec.matches(self.version):
+                return False  # Siblings not worth probing
+            meta = (self.machine, self.version)
+            if gxx and not (trust_names and self._name_meta(gxx) == meta):
+                if not self.test_bin(gxx, cache):
+                    gxx = ""
+            if gfortran and not (trust_names and self._name_meta(gfortran) == meta):
+                if not self.test_bin(gfortran, cache):
+                    gfortran = ""
         self.gcc = gcc
         self.gxx = gxx if gxx else ""
         self.gfortran = gfortran if gfortran else ""
         return True
 
-    def test_bin(self, name: Union[str, None]) -> bool:
+    @staticmethod
+    def _name_meta(name: str) -> Union[Tuple[str, Version], None]:
+        """Machine and full version from a name like x86_64-pc-linux-gnu-gcc-8.2.0,
+        None unless the name contains both
+        """
+        m = _match_bin(name)
+        if m is None:
+            return None
+        machine, _, version = m.group(1, 2, 3)
+        if not machine or not version or not re_version.match(version[1:]):
+            return None
+        return machine[:-1], Version.make(version[1:])
+
+    @staticmethod
+    def _name_version(name: str) -> Version:
+        """Full version from a name like gcc-8.2.0, empty if not in name"""
+        m = _match_bin(name)
+        if m is None or not m.group(3) or not re_version.match(m.group(3)[1:]):
+            return Version()
+        return Version.make(m.group(3)[1:])
+
+    @staticmethod
+    def _probe_bin(fn: str) -> Tuple[str, str]:
+        """Run binary and return version string and machine. Empty if not found"""
+        cmd = [fn, "-v"]
+        env = dict(os.environ, LC_ALL="C")
+        proc = subprocess.run(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,  # -v reports to stderr
+            env=env,
+            text=True,
+            check=True,
+            timeout=_PROBE_TIMEOUT,
+            close_fds=False,  # Lets Python use the faster posix_spawn/vfork path
+        )
+        verstr = ""
+        machine = ""
+        for line in proc.stdout.splitlines():
+            if line.startswith("Target: "):
+                machine = line[8:].strip()
+            elif line.startswith("gcc version "):
+                verstr = line[12:].split(" ", 1)[0]
+        return verstr, machine
+
+    @classmethod
+    def _try_probe_bin(cls, fn: str) -> Union[Tuple[str, str], None]:
+        """Same as _probe_bin but empty for binaries exiting with an error, so
+        they are cached like any other non-GCC binary. None if it could not run
+        to completion this time, which is not cached
+        """
+        try:
+            return cls._probe_bin(fn)
+        except subprocess.CalledProcessError:
+            return "", ""
+        except subprocess.TimeoutExpired as e:
+            log.warning("Timed out running %s", e.cmd[0])
+        except OSError as e:
+            log.debug("Could not run %s: %s", fn, e)
+        return None
+
+    def test_bin(
+        self, name: Union[str, None], cache: Union[ProbeCache, None] = None
+    ) -> bool:
         # Any binary (since tested 4.8.5) outputs:
         # XXX -dumpversion      -> major version or full version
         # XXX -dumpfullversion  -> full version, if flag is supported
         # XXX -dumpmachine      -> target arch + system like prefixed above
         # XXX --version         -> First line contains full version but varying formats...
         #                       -> Second line always contains copyright "Free Software Foundation"
-        # NOTE: -dumpfullversion -dumpversion  # Seem to properly report full version for all GCC
+        # XXX -v                -> To stderr, among other lines:
+        #                          "Target: " followed by same as -dumpmachine
+        #                          "gcc version " followed by full version
+        # NOTE: Only the first -dump flag is reported so they cannot be combined.
+        #       -v gives both in one run but is localized so run it with C locale
 
         if not name:
             return False
         try:
             debug = log.isEnabledFor(logging.DEBUG)
             fn = os.path.join(self.dir, name)
-            cmd = [fn, "--version"]
-            lines = subprocess.check_output(cmd).decode().splitlines()  # noqa: S603
-            if len(lines) < 2:
+            st = os.stat(fn)
+            ident = (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+            probed = _PROBED.get(ident)
+            # Binary is assumed unchanged if modification time and size match
+            hit = cache.get(fn) if cache is not None else None
+            valid = hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size
+            if probed is None:
+                probed = (hit[2], hit[3]) if valid else self._try_probe_bin(fn)
+                if probed is None:
+                    return False
+                _PROBED[ident] = probed
+            if cache is not None and not valid:
+                cache[fn] = [st.st_mtime_ns, st.st_size, *probed]
+            verstr, machine = probed
+            if not verstr or not machine:
                 if debug:
                     log.debug("INFO: Could not read version of %s", fn)
                 return False
-            l2 = lines[1].strip()
-            if "Free Software Foundation" not in l2:
+
+            if not re_version.match(verstr):
                 if debug:
-                    s = (
-                        "Could not read copyright of %s. Expected 'Free Software foundation' on line 2:\n"
-                        "    " + l2
+                    log.debug(
+                        "Could not read version of %s. Expected full 3 digit version: %s",
+                        fn,
+                        verstr,
                     )
-                    log.debug(s, fn)
-                return False
-
-            cmd = [fn, "-dumpfullversion", "-dumpversion"]
-            lines = subprocess.check_output(cmd).decode().splitlines()  # noqa: S603
-            if len(lines) != 1:
-                return False
-            verstr = lines[0].strip()
-            ver = Version.make_safe(verstr, minlen=3)
-            if not ver and debug:
-                log.debug(
-                    "Could not read version of %s. Expected full 3 digit version: %s",
-                    fn,
-                    verstr,
-                )
                 return False
+            ver = Version.make(verstr)
 
             if not self.version:
                 self.version = ver
@@ -232,28 +604,22 @@ class GCC:
                     )
                 return False
 
-            if self.machine:
-                return True
-
             # Only consider machine from one binary
-            cmd = [fn, "-dumpmachine"]
-            lines = subprocess.check_output(cmd).decode().splitlines()
-            if len(lines) != 1:
-                return False
-            self.machine = lines[0].strip()
+            if not self.machine:
+                self.machine = machine
             return True
 
-        except subprocess.CalledProcessError:
-            return False
         except ValueError:
             return False
+        except OSError:
+            return False
+
+    def meta_key(self) -> Tuple[str, Version, str]:
+        """Products with same key are the same installation"""
+        return (self.dir, self.version, self.machine)
 
     def is_meta_equal(self, other: "GCC") -> bool:
-        return (
-            self.dir == other.dir
-            and self.version == other.version
-            and self.machine == other.machine
-        )
+        return self.meta_key() == other.meta_key()
 
     def keep_meta(self, other: GCCType) -> GCCType:
         # Both must have gcc and g++
@@ -268,12 +634,59 @@ class GCC:
             return self  # type: ignore
         return other
 
+    @classmethod
+    def _probe(
+        cls,
+        dir: str,
+        vals: List[str],
+        names_checked: bool = False,
+        cache: Union[ProbeCache, None] = None,
+        spec: Union[VersionSpec, None] = None,
+    ) -> Union["GCC", None]:
+        """Return GCC of binaries [gcc, g++, gfortran] in dir if usable"""
+        # # Keep only those where gcc is found.
+        # # g++ or gfortran may be missing and this can be filtered out later
+        # if not vals[0]:
+        #     for i in (1, 2):
+        #         if vals[i]:
+        #             log.debug("Skipping due to no gcc found: %s", vals[i])
+        #     continue
+        obj = cls(dir)
+        if not obj.set_binaries(
+            gcc=vals[0],
+            gxx=vals[1],
+            gfortran=vals[2],
+            test=True,
+            cache=cache,
+            spec=spec,
+            trust_names=names_checked,
+        ):
+            return None
+        return obj
+
     @classmethod
     def scan(
         cls,
         dirs: Union[List[str], None] = None,
         extra_dirs: Union[List[str], None] = None,
+        sort: bool = True,
+        version: Union[VersionSpec, None] = None,
+        select: Union[Callable[[List["GCC"]], List["GCC"]], None] = None,
     ) -> List["GCC"]:
+        """Scan for GCC installations. If version is given then only matching
+        products are probed and returned. If select is given, filtering products
+        to choose among, probing stops when the best is known. See _probe_found
+        """
+        if version is not None and not version.l_val:
+            version = None  # Matches any
+        if not dirs and not extra_dirs:
+            products = cls._probe_found(_scan_hint(), version, select)
+            if products:
+                log.debug("Using GCC from environment hint")
+                if sort:
+                    products.sort(key=GCC.sort_key, reverse=True)
+                return products
+
         if not dirs:
             dirs = [
                 "/bin",
@@ -283,57 +696,118 @@ class GCC:
                 "$HOME",
             ]
 
-        scan_dirs = expand_dirs(dirs)
         if extra_dirs:
-            os.scandir()
-            scan_dirs.extend(expand_dirs(extra_dirs))
-        scan_dirs = list(set(scan_dirs))  # remove duplicates, don't care for order
-
-        log.debug("GCC Scan directories:")
-        for dir in scan_dirs:
-            log.debug(dir)
-
-        found: GccCollection = {}
-        for dir in scan_dirs:
-            if os.path.isdir(dir):
-                _scandir(dir, dest=found)
-
-        products: List[GCC] = []
-        for dir in found:
-            for vals in found[dir].values():
-                # # Keep only those where gcc is found.
-                # # g++ or gfortran may be missing and this can be filtered out later
-                # if not vals[0]:
-                #     for i in (1, 2):
-                #         if vals[i]:
-                #             log.debug("Skipping due to no gcc found: %s", vals[i])
-                #     continue
-
-                obj = GCC(dir)
-                if not obj.set_binaries(
-                    gcc=vals[0],
-                    gxx=vals[1],
-                    gfortran=vals[2],
-                    test=True,
-                ):
-                    continue
-
-                idx_match = -1
-                for idx, other in enumerate(products):
-                    if obj.is_meta_equal(other):
-                        idx_match = idx
-                        break
-                if idx_match == -1:
-                    products.append(obj)
-                else:
-                    other = products[idx_match]
-                    keep = obj.keep_meta(other)
-                    if keep == obj:
-                        products[idx_match] = obj  # Replace
-
-        products.sort(reverse=True)
+            dirs = dirs + extra_dirs
+        # Only existing directories, duplicates removed and order not cared for
+        scan_dirs = list(
+            {os.path.realpath(d) for d in expand_dirs(dirs) if os.path.isdir(d)}
+        )
+
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("GCC Scan directories:")
+            for dir in scan_dirs:
+                log.debug(dir)
+
+        found = _load_snapshot(scan_dirs)
+        if found is None:
+            found = {}
+            listed: Dict[str, int] = {}
+            bins: Dict[str, List[int]] = {}
+            with ThreadPoolExecutor(max_workers=_WORKERS) as executor:
+                _scandir(
+                    scan_dirs, dest=found, executor=executor, listed=listed, bins=bins
+                )
+            _save_snapshot(scan_dirs, listed, bins, found)
+        else:
+            log.debug("No directory changed since last GCC scan")
+
+        products = cls._probe_found(found, version, select)
+        if sort:
+            products.sort(key=GCC.sort_key, reverse=True)
         return products
 
+    @classmethod
+    def _probe_found(
+        cls,
+        found: GccCollection,
+        version: Union[VersionSpec, None] = None,
+        select: Union[Callable[[List["GCC"]], List["GCC"]], None] = None,
+    ) -> List["GCC"]:
+        """Probe all found binaries and merge into unique products
+
+        With select, candidates with a full version in their name are probed in
+        waves from highest version and the rest stop when a selected product
+        has a higher version. Assumes binaries are named by their true version
+        """
+        if not found:
+            return []
+
+        candidates: List[Candidate] = [
+            (dir, vals, fn_id != _HINT_ID)
+            for dir in found
+            for fn_id, vals in found[dir].items()
+        ]
+        if version is not None:
+            # Drop candidates whose name already tells the wrong version
+            # By version in gcc name
+            names = [(c, cls._name_version(c[1][0])) for c in candidates]
+            candidates = [c for c, ver in names if not ver or version.matches(ver)]
+
+        # Probing runs the binaries which is mostly process spawn and wait
+        cache = _load_cache()
+        loaded = dict(cache)
+        with ThreadPoolExecutor(max_workers=_WORKERS) as executor:
+
+            def probe(batch: List[Candidate]) -> List["GCC"]:
+                objs = executor.map(lambda c: cls._probe(*c, cache, version), batch)
+                return [obj for obj in objs if obj is not None]
+
+            if select is None:
+                products = cls._merge(probe(candidates))
+            else:
+                products = cls._probe_waves(candidates, probe, select)
+        if cache != loaded:
+            _save_cache(cache)
+        return products
+
+    @classmethod
+    def _probe_waves(
+        cls,
+        candidates: List[Candidate],
+        probe: Callable[[List[Candidate]], List["GCC"]],
+        select: Callable[[List["GCC"]], List["GCC"]],
+    ) -> List["GCC"]:
+        named: Dict[Tuple[int, ...], List[Candidate]] = {}
+        batch = []  # First wave also probes all without version in name
+        for c in candidates:
+            ver = cls._name_version(c[1][0])
+            if ver:
+                named.setdefault(ver.parts, []).append(c)
+            else:
+                batch.append(c)
+
+        probed: List[GCC] = []
+        for parts in sorted(named, reverse=True):
+            best = max(select(cls._merge(probed)), key=GCC.sort_key, default=None)
+            if best is not None and parts < best.version.parts:
+                log.debug("Skipping probe of GCC older than %s", best.version)
+                break
+            probed.extend(probe(batch + named[parts]))
+            batch = []
+        if batch:
+            probed.extend(probe(batch))
+        return cls._merge(probed)
+
+    @staticmethod
+    def _merge(probed: List["GCC"]) -> List["GCC"]:
+        """Merge products of same directory, version and machine"""
+        by_key: Dict[Tuple[str, Version, str], GCC] = {}
+        for obj in probed:
+            key = obj.meta_key()
+            other = by_key.get(key)
+            by_key[key] = obj if other is None else obj.keep_meta(other)
+        return list(by_key.values())
+
 
 class GCCToolkit(Toolkit):
     def __init__(
@@ -352,6 +826,7 @@ class GCCToolkit(Toolkit):
         self.scan_extradirs: List[str] = scan_extradirs if scan_extradirs else []
 
         self._scanned: Union[List[GCC], None] = None
+        self._scanned_for: int = _SCAN_SELECT  # What _scanned is complete for
         self._found: List[GCC] = []
 
         required_vars: Set[str] = {"CC", "CXX"}
@@ -371,7 +846,7 @@ class GCCToolkit(Toolkit):
     @override
     @staticmethod
     def is_supported() -> bool:
-        return platform.system() == "Linux"
+        return _IS_LINUX
 
     @override
     @staticmethod
@@ -385,7 +860,7 @@ class GCCToolkit(Toolkit):
 
     @override
     @staticmethod
-    def _add_arguments(prefix: str, parser: _ArgumentGroup) -> None:
+    def _add_arguments(prefix: str, parser: "_ArgumentGroup") -> None:
         parser.add_argument(
             f"--{prefix}ver",
             default=None,
@@ -422,7 +897,7 @@ class GCCToolkit(Toolkit):
 
     @override
     @classmethod
-    def _from_args(cls, prefix: str, args: Union[Namespace, None]) -> "GCCToolkit":
+    def _from_args(cls, prefix: str, args: Union["Namespace", None]) -> "GCCToolkit":
         if args is None:
             return cls()
         ver = getattr(args, prefix + "ver")
@@ -437,28 +912,46 @@ class GCCToolkit(Toolkit):
     @override
     def scan(self) -> int:
         self._found = []  # Reset filter and select
-        if self._scanned is None:
-            self._scanned = []  # Mark as scanned
-            try:
-                self._scanned = GCC.scan(
-                    dirs=self.scan_dirs, extra_dirs=self.scan_extradirs
-                )
-            except ScanError as e:
-                log.exception(e)
+        self._scan(_SCAN_ALL)
         return len(self._scanned)
 
+    def _scan(self, scan_for: int) -> None:
+        """Scan unless already done for scan_for. Scanning for filter only probes
+        matching versions and for select probing stops once the best is known
+        """
+        if self._scanned is not None and self._scanned_for >= scan_for:
+            return
+        self._scanned = []  # Mark as scanned
+        self._scanned_for = scan_for
+        try:
+            # Sorted on demand, select only needs the max
+            self._scanned = GCC.scan(
+                dirs=self.scan_dirs,
+                extra_dirs=self.scan_extradirs,
+                sort=False,
+                version=self.version if scan_for < _SCAN_ALL else None,
+                select=self._filter if scan_for == _SCAN_SELECT else None,
+            )
+        except ScanError as e:
+            log.exception(e)
+
     @override
     def scan_filter(self) -> int:
-        self.scan()
+        self._found = []
+        self._scan(_SCAN_FILTER)
         if self._scanned:
-            self._found = self._filter(self._scanned)
+            self._found = sorted(
+                self._filter(self._scanned), key=GCC.sort_key, reverse=True
+            )
         return len(self._found)
 
     @override
     def scan_select(self) -> bool:
-        self.scan_filter()
-        if len(self._found) > 1:
-            self._found = [self._found[0]]
+        self._found = []
+        self._scan(_SCAN_SELECT)
+        if self._scanned:
+            best = max(self._filter(self._scanned), key=GCC.sort_key, default=None)
+            self._found = [best] if best is not None else []
         return bool(self._found)
 
     @override
@@ -467,7 +960,7 @@ class GCCToolkit(Toolkit):
             for item in self._found:
                 item.print(detailed, cxx=self.with_cxx, fortran=self.with_fortran)
         elif self._scanned:
-            for item in self._scanned:
+            for item in sorted(self._scanned, key=GCC.sort_key, reverse=True):
                 item.print(detailed)
 
     def _filter(self, products: List[GCC]) -> List[GCC]:
@@ -475,21 +968,29 @@ class GCCToolkit(Toolkit):
             log.debug("No filtering required")
             return products
 
-        log.debug("Filtering using:")
-        log.debug("     cxx required: %s", self.with_cxx)
-        log.debug(" fortran required: %s", self.with_fortran)
-        log.debug(" version required: %s", self.version)
-
-        left = []
-        for product in products:
-            if self.with_cxx and not product.gxx:
-                continue
-            if self.with_fortran and not product.gfortran:
-                continue
-            if not self.version.matches(product.version):
-                continue
-            left.append(product)
-        return left
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Filtering using:")
+            log.debug("     cxx required: %s", self.with_cxx)
+            log.debug(" fortran required: %s", self.with_fortran)
+            log.debug(" version required: %s", self.version)
+
+        need_cxx = self.with_cxx
+        need_fortran = self.with_fortran
+        version = self.version
+        if not version.l_val:  # No spec, VersionSpec itself is always truthy
+            return [
+                p
+                for p in products
+                if (not need_cxx or p.gxx) and (not need_fortran or p.gfortran)
+            ]
+        matches = version.matches
+        return [
+            p
+            for p in products
+            if (not need_cxx or p.gxx)
+            and (not need_fortran or p.gfortran)
+            and matches(p.version)
+        ]
 
     @override
     def _add_post_env_vars(self, env: EnvDict) -> None:
@@ -2,10 +2,14 @@ import json
 import logging
 import os
 import platform
-from argparse import Namespace, _ArgumentGroup
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
 from functools import total_ordering
+from operator import attrgetter
 from subprocess import CalledProcessError, check_output
-from typing import Any, Dict, List, Set, TypeVar, Union
+from typing import TYPE_CHECKING, Any, ClassVar, Dict, List, Set, TypeVar, Union
 
 from .toolkit import Toolkit
 from .util import (
@@ -16,29 +20,54 @@ from .util import (
     override,  # Compatibility imports
 )
 
+if TYPE_CHECKING:  # argparse is only needed by the command line interface
+    from argparse import Namespace, _ArgumentGroup
+
 log = logging.getLogger(__name__)
 MSVCType = TypeVar("MSVCType", bound="MSVC")
 BuildToolType = TypeVar("BuildToolType", bound="BuildTool")
 
+_IS_WINDOWS = platform.system() == "Windows"
+_VSWHERE_PATH = (
+    os.path.expandvars(
+        r"%ProgramFiles(x86)%\Microsoft Visual Studio\Installer\vswhere.exe"
+    )
+    if _IS_WINDOWS
+    else ""
+)
+
+
+_VS_PRODUCT_PREFIX = "microsoft.visualstudio.product."
+_VS_EDITIONS = frozenset({"community", "professional", "enterprise", "buildtools"})
+_VS_YEARS = frozenset({Version(2017), Version(2019), Version(2022)})
+_VS_PRODUCTS = [
+    "Microsoft.VisualStudio.Product.Community",
+    "Microsoft.VisualStudio.Product.Professional",
+    "Microsoft.VisualStudio.Product.Enterprise",
+    "Microsoft.VisualStudio.Product.BuildTools",
+]
+
 
 def vs_version(val: Union[str, VersionSpec]) -> VersionSpec:
     return VersionSpec.make(val)  # Only allow major?
 
 
+# Build tool directories are named by full version, i.e. 14.20.27508
+re_build_tools = re.compile(r"\A[0-9]+\.[0-9]+\.[0-9]+\Z", re.ASCII)
+
+# Build tool version ranges of platform toolsets
+_TOOLSET_SPECS = {
+    "v143": VersionSpec(Version(14, 30), VersionOp.GTE, Version(14, 40), VersionOp.LT),
+    "v142": VersionSpec(Version(14, 20), VersionOp.GTE, Version(14, 30), VersionOp.LT),
+    "v141": VersionSpec(Version(14, 10), VersionOp.GTE, Version(14, 20), VersionOp.LT),
+}
+
+
 def build_tools_version(val: Union[str, VersionSpec]) -> VersionSpec:
     if val is not None and isinstance(val, str) and val.startswith("v"):
-        if val == "v143":
-            return VersionSpec(
-                Version(14, 30), VersionOp.GTE, Version(14, 40), VersionOp.LT
-            )
-        if val == "v142":
-            return VersionSpec(
-                Version(14, 20), VersionOp.GTE, Version(14, 30), VersionOp.LT
-            )
-        if val == "v141":
-            return VersionSpec(
-                Version(14, 10), VersionOp.GTE, Version(14, 20), VersionOp.LT
-            )
+        spec = _TOOLSET_SPECS.get(val)
+        if spec is not None:
+            return VersionSpec(spec)  # Copy, shared constants must not change
         raise ValueError(
             "Only build tools alternative version formats v143, v142 or v141 are supported"
         )
@@ -61,22 +90,30 @@ class BuildTool:
         self.version = version
         self.x64_tools = []
         self.x86_tools = []
+        self._tools_scanned = False  # Only needed for detailed printing
+
+    def _scan_tools(self) -> None:
+        self._tools_scanned = True
+        bindir = os.path.join(self.dir, "bin")
+        self.x86_tools = self._list_targets(os.path.join(bindir, "Hostx86"))
+        self.x64_tools = self._list_targets(os.path.join(bindir, "Hostx64"))
 
-        for host, tset in [("Hostx86", self.x86_tools), ("Hostx64", self.x64_tools)]:
-            hostdir = os.path.join(self.dir, "bin", host)
-            if os.path.isdir(hostdir):
-                for file in os.listdir(hostdir):
-                    if os.path.isdir(os.path.join(hostdir, file)):
-                        tset.append(file)
+    @staticmethod
+    def _list_targets(hostdir: str) -> List[str]:
+        try:
+            with os.scandir(hostdir) as it:
+                return [e.name for e in it if e.is_dir(follow_symlinks=False)]
+        except (FileNotFoundError, NotADirectoryError):
+            return []
 
     def name(self) -> str:
         return f"Build Tool {(self.version)}"
 
     def tool_names(self) -> List[str]:
-        ret = []
-        for host, targets in [("x64", self.x64_tools), ("x86", self.x86_tools)]:
-            for target in targets:
-                ret.append(target if host == target else f"{host}_{target}")
+        if not self._tools_scanned:
+            self._scan_tools()
+        ret = [t if t == "x64" else f"x64_{t}" for t in self.x64_tools]
+        ret.extend(t if t == "x86" else f"x86_{t}" for t in self.x86_tools)
         return ret
 
     def __lt__(self, other: Any) -> bool:
@@ -90,6 +127,18 @@ class BuildTool:
         return self.version == other.version
 
 
+_DETAILED_FMT = (
+    "    Instance ID: %s\n"
+    "     Product ID: %s\n"
+    "        Product: %s\n"
+    "Product Version: %s\n"
+    "Display Version: %s\n"
+    "   Full Version: %s\n"
+    "   Install Path: %s\n"
+    "          Valid: %s"
+)
+
+
 r"""
 Class to find installed:
 * Visual Studio or Build Tools, using vswhere?
@@ -118,6 +167,10 @@ Class to find installed:
 
 
 class MSVC:
+    # Products of the last scan in this process, see scan_products
+    _cached_products: ClassVar[Union[List["MSVC"], None]] = None
+    _cache_lock: ClassVar[threading.Lock] = threading.Lock()
+
     def __init__(self) -> None:
         self.instanceId: str = ""  # 9bfa93d9
         self.productId: str = ""  # Microsoft.VisualStudio.Product.Professional
@@ -134,15 +187,17 @@ class MSVC:
             return
 
         if detailed:
-            validstr = "True" if self.isValid else "False"
-            log.info("    Instance ID: %s", self.instanceId)
-            log.info("     Product ID: %s", self.productId)
-            log.info("        Product: %s", self.displayName)
-            log.info("Product Version: %s", self.productVersion)
-            log.info("Display Version: %s", self.displayVersion)
-            log.info("   Full Version: %s", self.fullVersion)
-            log.info("   Install Path: %s", self.installDir)
-            log.info("          Valid: %s", validstr)
+            log.info(
+                _DETAILED_FMT,
+                self.instanceId,
+                self.productId,
+                self.displayName,
+                self.productVersion,
+                self.displayVersion,
+                self.fullVersion,
+                self.installDir,
+                self.isValid,
+            )
             if list_buildtools:
                 for tool in self.vcBuildTools:
                     log.info("     Build Tool: %s", tool.version)
@@ -158,16 +213,18 @@ class MSVC:
     def create(cls, json: Dict[str, Any]) -> Union["MSVC", None]:
         obj = MSVC()
         obj.productId = json.get("productId", "")
-        if not obj.productId.lower().startswith("microsoft.visualstudio.product."):
+        product_id = obj.productId.lower()
+        if not product_id.startswith(_VS_PRODUCT_PREFIX):
             log.debug("Skipping product: %s", obj.productId)
             return None
-        last = obj.productId.split(".", 4)[3].lower()
-        if last not in ["community", "professional", "enterprise", "buildtools"]:
+        edition = product_id[len(_VS_PRODUCT_PREFIX) :].partition(".")[0]
+        if edition not in _VS_EDITIONS:
             return None
 
         obj.instanceId = json.get("instanceId", "")
         obj.installDir = json.get("installationPath", "")
         obj.displayName = json.get("displayName", "")
+        obj.isValid = json.get("isComplete", False)
         if "catalog" in json:
             catalog = json["catalog"]
             if not isinstance(catalog, dict):
@@ -179,7 +236,6 @@ class MSVC:
             obj.fullVersion = Version.make(catalog.get("buildVersion", ""))
         else:
             log.debug('No "catalog" in json')
-        obj.isValid = json.get("isComplete", False)
         obj.validate_info()
         return obj
 
@@ -193,7 +249,7 @@ class MSVC:
                 and self.fullVersion
             )
         if self.isValid:
-            self.isValid = self.productVersion in [2017, 2019, 2022]
+            self.isValid = self.productVersion in _VS_YEARS
         if self.isValid:
             self.isValid = len(self.displayVersion) >= 1  # Let's be nice
         if self.isValid:
@@ -202,22 +258,48 @@ class MSVC:
         return self.isValid
 
     @classmethod
-    def scan_products(cls) -> List["MSVC"]:
-        products = cls._scan_vs_installs()
-        for product in products:
-            cls._scan_build_tools(product)
-        return products
+    def scan_products(cls, force: bool = False) -> List["MSVC"]:
+        """Scan once per process unless forced. Products are shared with the
+        cache, toolkits narrow down build tools on copies of them
+        """
+        if not _IS_WINDOWS:
+            return []
+        with MSVC._cache_lock:
+            if force or MSVC._cached_products is None:
+                products = cls._scan_vs_installs()
+                if len(products) > 1:
+                    # Independent directory reads, run concurrently
+                    with ThreadPoolExecutor(max_workers=min(8, len(products))) as ex:
+                        list(ex.map(cls._scan_build_tools, products))
+                else:
+                    for product in products:
+                        cls._scan_build_tools(product)
+                MSVC._cached_products = products
+            return list(MSVC._cached_products)
+
+    @staticmethod
+    def invalidate_cache() -> None:
+        with MSVC._cache_lock:
+            MSVC._cached_products = None
 
     @classmethod
     def _scan_vs_installs(cls) -> List["MSVC"]:
-        vswhere = os.path.expandvars(
-            r"%ProgramFiles(x86)%\Microsoft Visual Studio\Installer\vswhere.exe"
-        )
+        vswhere = _VSWHERE_PATH
         if not os.path.isfile(vswhere):
             log.debug("Could not find vswhere utility: %s", vswhere)
             return []
-        cmd = [vswhere, "-products", "*", "-all", "-format", "json"]
-        log.debug("Running %s", " ".join(cmd))
+        # Only products accepted by MSVC.create, as UTF-8 regardless of code page
+        cmd = [
+            vswhere,
+            "-products",
+            *_VS_PRODUCTS,
+            "-all",
+            "-format",
+            "json",
+            "-utf8",
+        ]
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Running %s", " ".join(cmd))
         try:
             out = check_output(cmd)
         except CalledProcessError as e:
@@ -236,15 +318,13 @@ class MSVC:
     @classmethod
     def _scan_build_tools(cls, msvc: "MSVC") -> None:
         kitdir = os.path.join(msvc.installDir, "VC", "Tools", "MSVC")
-        for file in os.listdir(kitdir):
-            fn = os.path.join(kitdir, file)
-            if not os.path.isdir(fn):
-                continue
-            dirver = Version.make_safe(file)
-            if not dirver:
-                continue
-            msvc.vcBuildTools.append(BuildTool(fn, dirver))
-        msvc.vcBuildTools.sort(reverse=True)
+        with os.scandir(kitdir) as it:
+            for entry in it:
+                if not re_build_tools.match(entry.name) or not entry.is_dir():
+                    continue
+                dirver = Version.make(entry.name)
+                msvc.vcBuildTools.append(BuildTool(entry.path, dirver))
+        msvc.vcBuildTools.sort(key=attrgetter("version"), reverse=True)
 
 
 class MSVCToolkit(Toolkit):
@@ -281,7 +361,7 @@ class MSVCToolkit(Toolkit):
     @override
     @staticmethod
     def is_supported() -> bool:
-        return platform.system() == "Windows"
+        return _IS_WINDOWS
 
     @override
     @staticmethod
@@ -290,7 +370,7 @@ class MSVCToolkit(Toolkit):
 
     @override
     @staticmethod
-    def _add_arguments(prefix: str, parser: _ArgumentGroup) -> None:
+    def _add_arguments(prefix: str, parser: "_ArgumentGroup") -> None:
         parser.add_argument(
             f"--{prefix}ver",
             default=None,
@@ -315,7 +395,7 @@ class MSVCToolkit(Toolkit):
 
     @override
     @classmethod
-    def _from_args(cls, prefix: str, args: Union[Namespace, None]) -> "MSVCToolkit":
+    def _from_args(cls, prefix: str, args: Union["Namespace", None]) -> "MSVCToolkit":
         if args is None:
             return cls()
         ver = getattr(args, prefix + "ver")
@@ -345,30 +425,30 @@ class MSVCToolkit(Toolkit):
     def scan_select(self) -> bool:
         self.scan_filter()
         if self._found:
-            sel = self._found[0]
-            if sel.vcBuildTools:
-                sel.vcBuildTools = [sel.vcBuildTools[0]]
+            sel = copy(self._found[0])
+            sel.vcBuildTools = sel.vcBuildTools[:1]
             self._found = [sel]
         return bool(self._found)
 
     def _filter(self, products: List[MSVC]) -> List[MSVC]:
+        """Scanned products are left untouched, narrowed products are copies"""
         if not self.vs_version and not self.tools_version and not self.winsdk_version:
-            return products
+            return list(products)
 
         left = []
         for product in products:
-            # print(product.productVersion)
-            # print(self.vs_version)
             if not self.vs_version.matches(product.productVersion):
                 continue
 
             if self.tools_version:
-                left_tools: List[BuildTool] = []
-                for tools in product.vcBuildTools:
-                    if self.tools_version.matches(tools.version):
-                        left_tools.append(tools)
+                left_tools = [
+                    tools
+                    for tools in product.vcBuildTools
+                    if self.tools_version.matches(tools.version)
+                ]
                 if not left_tools:
                     continue
+                product = copy(product)
                 product.vcBuildTools = left_tools
 
             left.append(product)
@@ -414,11 +494,12 @@ class MSVCToolkit(Toolkit):
         sel = self._found[0]
         build_tools = sel.vcBuildTools[0]
 
-        str = "@echo off\n"
         # TODO Scan for VSXXXXINSTALLDIR environment variables
         # TODO Support arch, winsdk_version and vc_version - But only possible without oneAPI (for now)
         # call "C:\Program Files (x86)\Microsoft Visual Studio\2019\Professional\VC\Auxiliary\Build\vcvarsall.bat" amd64
-        str += f'call "C:\\Program Files (x86)\\Microsoft Visual Studio\\{sel.productVersion}\\Professional\\VC\\Auxiliary\\Build\\vcvarsall.bat" amd64 -vcvars_ver={build_tools.version}\n'
-        str += "set CC=cl.exe\n"
-        str += "set CXX=cl.exe\n"
-        return str
+        return (
+            "@echo off\n"
+            f'call "C:\\Program Files (x86)\\Microsoft Visual Studio\\{sel.productVersion}\\Professional\\VC\\Auxiliary\\Build\\vcvarsall.bat" amd64 -vcvars_ver={build_tools.version}\n'
+            "set CC=cl.exe\n"
+            "set CXX=cl.exe\n"
+        )
@@ -1,10 +1,21 @@
 import logging
 import os
 import platform
-import sys
-from argparse import Namespace, _ArgumentGroup
+import threading
 from functools import total_ordering
-from typing import Any, Dict, Iterable, List, NamedTuple, Set, TypeVar, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    ClassVar,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 from .msvc import MSVCToolkit
 from .toolkit import Toolkit
@@ -16,9 +27,23 @@ from .util import (
     override,  # Compatibility imports
 )
 
+if TYPE_CHECKING:  # argparse is only needed by the command line interface
+    from argparse import Namespace, _ArgumentGroup
+
 log = logging.getLogger(__name__)
 OneAPIType = TypeVar("OneAPIType", bound="OneAPI")
 
+_IS_LINUX = platform.system() == "Linux"
+_IS_WINDOWS = platform.system() == "Windows"
+
+# What a toolkit scan is complete for, all includes filter
+_SCAN_FILTER = 0
+_SCAN_ALL = 1
+
+# Fortran choices accepting each compiler
+_WANT_IFX = frozenset({"any", "ifx"})
+_WANT_IFORT = frozenset({"any", "ifort"})
+
 
 def oneapi_version(val: Union[str, VersionSpec]) -> VersionSpec:
     return VersionSpec.make(val)  # Care about length?
@@ -26,16 +51,24 @@ def oneapi_version(val: Union[str, VersionSpec]) -> VersionSpec:
 
 class _CompDirs(NamedTuple):
     varspath: str
-    ifortpaths: List[str]
-    ifxpaths: List[str]
+    ifort: str  # Executable names and directories to look for them in
+    ifx: str
+    ifortdirs: List[str]
+    ifxdirs: List[str]
 
 
 @total_ordering
 class OneAPI:
     COMPONENTS = ["compiler", "mkl"]  # , "tbb", "mpi"]
+    COMPONENTS_SET = frozenset(COMPONENTS)
     FORTRAN = ["ifx", "ifort"]
     TARGET = "intel64"
 
+    # Scans in this process by root_dir and ONEAPI_ROOT, see scan. Toolkits may
+    # scan from several threads, so the lock is held over lookup and scan
+    _cached_products: ClassVar[Dict[Tuple[str, str, bool, str], List["OneAPI"]]] = {}
+    _cache_lock: ClassVar[threading.Lock] = threading.Lock()
+
     def __init__(self, dir: str) -> None:
         self.dir: str = dir
         self.version: Version = Version()
@@ -69,23 +102,25 @@ class OneAPI:
         fortran: str = "any",
         components: List[str] = COMPONENTS,
     ) -> None:
+        if not log.isEnabledFor(logging.INFO):
+            return
         print_comp = {c: path for c, path in self.components.items() if c in components}
 
         if detailed:
             log.info("   Product: Intel oneAPI %s", self.version.major)
             log.info("   Version: %s", self.version)
-            if fortran in ["any", "ifx"]:
+            if fortran in _WANT_IFX:
                 log.info("       ifx: %s", self.ifx_path())
-            if fortran in ["any", "ifort"]:
+            if fortran in _WANT_IFORT:
                 log.info("     ifort: %s", self.ifort_path())
             log.info("Components:")
             for name, path in print_comp.items():
                 log.info("  - %s: %s", name, path)
         else:
             compilers = []
-            if fortran in ["any", "ifx"] and self.ifx_path():
+            if fortran in _WANT_IFX and self.ifx_path():
                 compilers.append("ifx")
-            if fortran in ["any", "ifort"] and self.ifort_path():
+            if fortran in _WANT_IFORT and self.ifort_path():
                 compilers.append("ifort")
             log.info(" * Product: Intel oneAPI %s", self.version.major)
             log.info("       Version: %s", self.version)
@@ -94,7 +129,49 @@ class OneAPI:
         log.info("")
 
     @classmethod
-    def scan(cls, root_dir: str = "") -> List["OneAPI"]:
+    def scan(
+        cls,
+        root_dir: str = "",
+        force: bool = False,
+        fortran: bool = True,
+        version: Union[VersionSpec, None] = None,
+    ) -> List["OneAPI"]:
+        """Scan once per process and root unless forced. Products are not modified
+        by toolkits so the returned list only needs to be a shallow copy.
+        Without fortran no compilers are looked for and with version only matching
+        versions are scanned, but any cached scan covering the request is used
+        """
+        spec = str(version) if version is not None and version.l_val else ""
+        oneapi_root = os.environ.get("ONEAPI_ROOT", "")
+        products = None
+        with OneAPI._cache_lock:
+            if not force:
+                for key in [
+                    (root_dir, oneapi_root, True, ""),
+                    (root_dir, oneapi_root, fortran, ""),
+                    (root_dir, oneapi_root, True, spec),
+                    (root_dir, oneapi_root, fortran, spec),
+                ]:
+                    products = OneAPI._cached_products.get(key)
+                    if products is not None:
+                        break
+            if products is None:
+                products = cls._scan(root_dir, fortran, version if spec else None)
+                key = (root_dir, oneapi_root, fortran, spec)
+                OneAPI._cached_products[key] = products
+        if spec:
+            return [p for p in products if version.matches(p.version)]
+        return list(products)
+
+    @staticmethod
+    def invalidate_cache() -> None:
+        with OneAPI._cache_lock:
+            OneAPI._cached_products.clear()
+
+    @classmethod
+    def _scan(
+        cls, root_dir: str, fortran: bool, version: Union[VersionSpec, None]
+    ) -> List["OneAPI"]:
         if root_dir:
             dirs = [root_dir]
         else:
@@ -103,7 +180,7 @@ class OneAPI:
         if "ONEAPI_ROOT" in os.environ:
             dirs.append(os.environ["ONEAPI_ROOT"])
 
-        if platform.system() == "Linux":
+        if _IS_LINUX:
             dirs.extend(["/opt/intel/oneapi", "$HOME/intel/oneapi"])
             osdir = "linux"
             scriptsuffix = ".sh"
@@ -115,47 +192,41 @@ class OneAPI:
             exesuffix = ".exe"
 
         compdirs = _CompDirs(
-            ifortpaths=[
-                os.path.join(osdir, "bin", OneAPI.TARGET, "ifort" + exesuffix),
-                os.path.join("bin", "ifort" + exesuffix),
-            ],
-            ifxpaths=[
-                os.path.join(osdir, "bin", "ifx" + exesuffix),
-                os.path.join("bin", "ifx" + exesuffix),
-            ],
+            ifort="ifort" + exesuffix,
+            ifx="ifx" + exesuffix,
+            ifortdirs=[os.path.join(osdir, "bin", OneAPI.TARGET), "bin"],
+            ifxdirs=[os.path.join(osdir, "bin"), "bin"],
             varspath=os.path.join("env", "vars" + scriptsuffix),
         )
 
-        scan_dirs = expand_dirs(dirs)
-        scan_dirs = list(set(scan_dirs))  # remove duplicates, don't care for order
+        # Remove duplicates before and after realpath, keeping order for stable output
+        scan_dirs = list(dict.fromkeys(expand_dirs(list(dict.fromkeys(dirs)))))
 
-        log.debug("Scan directories:")
-        for dir in scan_dirs:
-            log.debug(dir)
+        debug = log.isEnabledFor(logging.DEBUG)
+        if debug:
+            log.debug("Scan directories:")
+            for dir in scan_dirs:
+                log.debug(dir)
 
         products: List[OneAPI] = []
         for rootdir in scan_dirs:
-            allver = []
             if not os.path.isdir(rootdir):
                 continue
 
             log.debug("Scanning: %s", rootdir)
 
-            for comp in OneAPI.COMPONENTS:
-                compdir = os.path.join(rootdir, comp)
-                if os.path.isdir(compdir):
-                    for file in os.listdir(compdir):
-                        ver = Version.make_safe(file)
-                        if ver and ver not in allver:
-                            allver.append(ver)
-            allver.sort(reverse=True)
+            versions = cls._list_versions(rootdir)
+            if version is not None:
+                versions = {v: p for v, p in versions.items() if version.matches(v)}
+            allver = sorted(versions, reverse=True)
 
-            log.debug("Found potential versions:")
-            for ver in allver:
-                log.debug(" * %s", ver)
+            if debug:
+                log.debug("Found potential versions:")
+                for ver in allver:
+                    log.debug(" * %s", ver)
 
             for ver in allver:
-                obj = cls._scan_version(rootdir, ver, compdirs)
+                obj = cls._scan_version(rootdir, ver, versions[ver], compdirs, fortran)
                 if obj is not None:
                     products.append(obj)
 
@@ -164,44 +235,85 @@ class OneAPI:
         products.sort(reverse=True)
         return products
 
+    @staticmethod
+    def _list_versions(rootdir: str) -> Dict[Version, Dict[str, str]]:
+        """Version directories of each component in one pass over the root, so
+        components are only probed for versions they have
+        """
+        versions: Dict[Version, Dict[str, str]] = {}
+        for comp in OneAPI.COMPONENTS:
+            try:
+                with os.scandir(os.path.join(rootdir, comp)) as it:
+                    for entry in it:
+                        if not entry.name[:1].isdigit():
+                            continue  # latest, hidden files etc.
+                        ver = Version.make_safe(entry.name)
+                        if ver and entry.is_dir():
+                            versions.setdefault(ver, {})[comp] = entry.path
+            except (FileNotFoundError, NotADirectoryError):
+                pass
+        return versions
+
     @classmethod
     def _scan_version(
-        cls, rootdir: str, ver: Version, compdirs: _CompDirs
+        cls,
+        rootdir: str,
+        ver: Version,
+        comp_paths: Dict[str, str],
+        compdirs: _CompDirs,
+        fortran: bool = True,
     ) -> Union["OneAPI", None]:
         obj = OneAPI(rootdir)
         obj.version = ver
-        found_comps = 0
 
-        for name in OneAPI.COMPONENTS:
-            comp_path = os.path.join(rootdir, name, str(ver))
-            vars_path = os.path.join(comp_path, compdirs.varspath)
+        sep = os.sep
+        varspath = compdirs.varspath
+        for name in OneAPI.COMPONENTS:  # Keep component order
+            comp_path = comp_paths.get(name)
+            if comp_path is None:
+                continue
+            vars_path = f"{comp_path}{sep}{varspath}"
             log.debug("Checking: %s", vars_path)
             if os.path.isfile(vars_path):
-                found_comps += 1
                 obj.components[name] = vars_path
-                if name == "compiler":
-                    for p in compdirs.ifortpaths:
-                        ifort_path = os.path.join(comp_path, p)
-                        log.debug("Checking for ifort: %s", ifort_path)
-                        if os.path.exists(ifort_path):
-                            obj.ifort = ifort_path
-                            break
+                if fortran and name == "compiler":
+                    listed: Dict[str, Set[str]] = {}  # Both may be in the same dir
+                    obj.ifort = cls._find_exe(
+                        comp_path, compdirs.ifortdirs, compdirs.ifort, listed
+                    )
                     log.debug("Found ifort: %s", bool(obj.ifort))
-                    for p in compdirs.ifortpaths:
-                        ifx_path = os.path.join(comp_path, p)
-                        log.debug("Checking for ifx: %s", ifx_path)
-                        if os.path.exists(ifx_path):
-                            obj.ifx = ifx_path
-                            break
+                    obj.ifx = cls._find_exe(
+                        comp_path, compdirs.ifxdirs, compdirs.ifx, listed
+                    )
                     log.debug("Found ifx: %s", bool(obj.ifx))
-        if found_comps:
+        if obj.components:
             return obj
         return None
 
+    @staticmethod
+    def _find_exe(
+        comp_path: str, dirs: List[str], exe: str, listed: Dict[str, Set[str]]
+    ) -> str:
+        """Path of exe in the first of dirs containing it, listing each dir once"""
+        for d in dirs:
+            path = f"{comp_path}{os.sep}{d}"
+            names = listed.get(path)
+            if names is None:
+                log.debug("Checking for %s: %s", exe, path)
+                try:
+                    with os.scandir(path) as it:
+                        names = {entry.name for entry in it}
+                except (FileNotFoundError, NotADirectoryError):
+                    names = set()
+                listed[path] = names
+            if exe in names:
+                return f"{path}{os.sep}{exe}"
+        return ""
+
 
 class OneAPIToolkit(Toolkit):
-    VALID_FORTRAN = ["any"] + OneAPI.FORTRAN + ["none"]
-    VALID_COMPONENTS = ["all"] + OneAPI.COMPONENTS
+    VALID_FORTRAN = frozenset(["any", *OneAPI.FORTRAN, "none"])
+    VALID_COMPONENTS = frozenset(["all", *OneAPI.COMPONENTS])
 
     def __init__(
         self,
@@ -217,6 +329,7 @@ class OneAPIToolkit(Toolkit):
         self.root_dir: str = root_dir
 
         self._scanned: Union[List[OneAPI], None] = None
+        self._scanned_for: int = _SCAN_FILTER  # What _scanned is complete for
         self._found: List[OneAPI] = []
 
         if fortran in OneAPIToolkit.VALID_FORTRAN:
@@ -224,6 +337,8 @@ class OneAPIToolkit(Toolkit):
                 self.fortran = ""
             else:
                 self.fortran = fortran
+        self._want_ifx = self.fortran in _WANT_IFX
+        self._want_ifort = self.fortran in _WANT_IFORT
 
         if components:
             if isinstance(components, str):
@@ -234,6 +349,7 @@ class OneAPIToolkit(Toolkit):
                 self.components = list(components)
                 if self.fortran != "none" and "compiler" not in self.components:
                     self.components.insert(0, "compiler")
+        self._components_set = frozenset(self.components)
         self.root_dir = root_dir
 
         if not name:
@@ -252,7 +368,7 @@ class OneAPIToolkit(Toolkit):
     @override
     @staticmethod
     def is_supported() -> bool:
-        return platform.system() in ["Linux", "Windows"]
+        return _IS_LINUX or _IS_WINDOWS
 
     # def _is_compat_vs(self, tk):
     #     __oa2022_3 = Version(2022, 3)
@@ -281,7 +397,7 @@ class OneAPIToolkit(Toolkit):
 
     @override
     def is_instance_supported(self) -> bool:
-        if sys.platform != "win32":
+        if not _IS_WINDOWS:
             return True
         tk = self._get_vs_in_chain()
         if tk is None:
@@ -302,7 +418,7 @@ class OneAPIToolkit(Toolkit):
 
     @override
     @staticmethod
-    def _add_arguments(prefix: str, parser: _ArgumentGroup) -> None:
+    def _add_arguments(prefix: str, parser: "_ArgumentGroup") -> None:
         parser.add_argument(
             f"--{prefix}ver",
             default=None,
@@ -335,7 +451,7 @@ class OneAPIToolkit(Toolkit):
 
     @override
     @classmethod
-    def _from_args(cls, prefix: str, args: Union[Namespace, None]) -> "OneAPIToolkit":
+    def _from_args(cls, prefix: str, args: Union["Namespace", None]) -> "OneAPIToolkit":
         if args is None:
             return cls()
         ver = getattr(args, prefix + "ver")
@@ -349,17 +465,33 @@ class OneAPIToolkit(Toolkit):
     @override
     def scan(self) -> int:
         self._found = []  # Reset filter and select
-        if self._scanned is None:
-            self._scanned = []  # Mark as scanned
-            try:
-                self._scanned = OneAPI.scan(root_dir=self.root_dir)
-            except ScanError as e:
-                log.exception(e)
+        self._scan(_SCAN_ALL)
         return len(self._scanned)
 
+    def _scan(self, scan_for: int) -> None:
+        """Scan unless already done for scan_for. Scanning for filter only scans
+        matching versions and skips compilers unless Fortran is wanted
+        """
+        if self._scanned is not None and self._scanned_for >= scan_for:
+            return
+        self._scanned = []  # Mark as scanned
+        self._scanned_for = scan_for
+        try:
+            if scan_for == _SCAN_ALL:
+                self._scanned = OneAPI.scan(root_dir=self.root_dir)
+            else:
+                self._scanned = OneAPI.scan(
+                    root_dir=self.root_dir,
+                    fortran=bool(self.fortran),
+                    version=self.version,
+                )
+        except ScanError as e:
+            log.exception(e)
+
     @override
     def scan_filter(self) -> int:
-        self.scan()
+        self._found = []
+        self._scan(_SCAN_FILTER)
         if self._scanned:
             self._found = self._filter(self._scanned)
         return len(self._found)
@@ -381,27 +513,17 @@ class OneAPIToolkit(Toolkit):
                 item.print(detailed)
 
     def _filter(self, products: List[OneAPI]) -> List[OneAPI]:
-        left = []
-        for product in products:
-            if self.fortran != "none":
-                if product.ifort and not product.ifx:
-                    continue
-                elif self.fortran == "ifort" and not product.ifort:
-                    continue
-                elif self.fortran == "ifx" and not product.ifx:
-                    continue
-            found = True
-            if "any" not in self.components:
-                for prod in self.components:
-                    if prod not in product.components:
-                        found = False
-                        break
-            if not found:
-                continue
-            if self.version and not self.version.matches(product.version):
-                continue
-            left.append(product)
-        return left
+        return [product for product in products if self._keep(product)]
+
+    def _keep(self, product: OneAPI) -> bool:
+        """Cheapest checks first"""
+        if self.version.l_val and not self.version.matches(product.version):
+            return False
+        if (self._want_ifx or self._want_ifort) and not (
+            (self._want_ifx and product.ifx) or (self._want_ifort and product.ifort)
+        ):
+            return False
+        return product.components.keys() >= self._components_set
 
     def _select(self, products: List[OneAPI]) -> Union[OneAPI, None]:
         # Already filtered and sorted
@@ -415,7 +537,7 @@ class OneAPIToolkit(Toolkit):
 
     def _get_path_vars(self) -> Set[str]:
         vars = {"CPATH", "CMAKE_PREFIX_PATH", "PKG_CONFIG_PATH"}
-        if sys.platform == "win32":
+        if _IS_WINDOWS:
             vars |= {"INCLUDE", "LIB", "NLSPATH", "OCL_ICD_FILENAMES"}
         else:
             vars |= {"LIBRARY_PATH", "LD_LIBRARY_PATH", "MANPATH", "FI_PROVIDER_PATH"}
@@ -438,28 +560,30 @@ class OneAPIToolkit(Toolkit):
         #      tbb: intel64|ia32
         #      mpi: vars.sh [-i_mpi_ofi_internal[=0|1]] [-i_mpi_library_kind[=debug|debug_mt|release|release_mt]]
 
-        str = ""
-        if platform.system() == "Linux":
-            str = "#!/bin/bash\n"
-            for path in obj.components.values():
-                str += f'source "{path}"\n'
-            if self.fortran in ["any", "ifx"] and obj.ifx:
-                str += f'export FC="{obj.ifx}"\n'
-            elif self.fortran in ["any", "ifort"] and obj.ifort:
-                str += f'export FC="{obj.ifort}"\n'
-        elif platform.system() == "Windows":
-            str = "@echo off\n"
+        fc = ""
+        if self._want_ifx and obj.ifx:
+            fc = obj.ifx
+        elif self._want_ifort and obj.ifort:
+            fc = obj.ifort
+
+        parts: List[str] = []
+        if _IS_LINUX:
+            parts.append("#!/bin/bash\n")
+            parts.extend(f'source "{path}"\n' for path in obj.components.values())
+            if fc:
+                parts.append(f'export FC="{fc}"\n')
+        elif _IS_WINDOWS:
+            parts.append("@echo off\n")
             # tk = self._GetVisualStudioInChain()
             # if tk is not None and tk.vs_version:
-            #    str += f"set VSCMD_VER={tk.vs_version}\n"
-            str += "if not defined VSCMD_VER (\n"
-            str += '    echo "ERROR: Visual Studio needs to be setup before"\n'
-            str += "    exit /B 1\n"
-            str += ")\n"
-            for path in obj.components.values():
-                str += f'call "{path}"\n'
-            if self.fortran in ["any", "ifx"] and obj.ifx:
-                str += f"set FC={obj.ifx}\n"
-            elif self.fortran in ["any", "ifort"] and obj.ifort:
-                str += f"set FC={obj.ifort}\n"
-        return str
+            #    parts.append(f"set VSCMD_VER={tk.vs_version}\n")
+            parts.append(
+                "if not defined VSCMD_VER (\n"
+                '    echo "ERROR: Visual Studio needs to be setup before"\n'
+                "    exit /B 1\n"
+                ")\n"
+            )
+            parts.extend(f'call "{path}"\n' for path in obj.components.values())
+            if fc:
+                parts.append(f"set FC={fc}\n")
+        return "".join(parts)
@@ -5,9 +5,20 @@ import platform
 import shutil
 import sys
 from abc import ABCMeta, abstractmethod
-from argparse import Namespace, _ArgumentGroup
 from copy import deepcopy
-from typing import Any, Dict, List, NamedTuple, Set, Tuple, TypeVar, Union
+from functools import lru_cache
+from importlib import import_module
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    NamedTuple,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 from .util import (
     EnvDict,
@@ -19,12 +30,17 @@ from .util import (
     override,  # Compatibility imports
 )
 
+if TYPE_CHECKING:  # argparse is only needed by the command line interface
+    from argparse import Namespace, _ArgumentGroup
+
 log: logging.Logger = logging.getLogger(__name__)
 ToolkitType = TypeVar("ToolkitType", bound="Toolkit")
 ToolkitChainType = TypeVar("ToolkitChainType", bound="ToolkitChain")
 ToolkitInstanceType = TypeVar("ToolkitInstanceType", bound="ToolkitInstance")
 
 _TOOLKITS: Dict[str, "Toolkit"] = {}
+_TOOLKIT_MODULES = [".gcc", ".msvc", ".oneapi"]  # Imported by get_toolkits()
+_TOOLKITS_LOADED = False
 _DEBUG = False
 
 if _DEBUG:
@@ -40,9 +56,11 @@ if _DEBUG:
 def _register_toolkit(cls: Any) -> None:
     global _TOOLKITS
     name = cls.__name__
+    # ABCMeta has not yet set the abstract flag but inspect handles that
+    cls._is_abstract = inspect.isabstract(cls)
     if name in ["ToolkitChain", "ScriptToolkit"]:
         return
-    if not inspect.isabstract(cls):
+    if not cls._is_abstract:
         log.debug("Register toolkit: %s", name)
         _TOOLKITS[name] = cls
     elif _DEBUG:
@@ -54,6 +72,12 @@ def _register_toolkit(cls: Any) -> None:
 
 
 def get_toolkits() -> Dict[str, "Toolkit"]:
+    global _TOOLKITS_LOADED
+    if not _TOOLKITS_LOADED:
+        # Toolkits register on import
+        for name in _TOOLKIT_MODULES:
+            import_module(name, __package__)
+        _TOOLKITS_LOADED = True
     return _TOOLKITS
 
 
@@ -105,6 +129,8 @@ class ToolkitScanner(metaclass=SingletonABCMeta):
 class Toolkit(metaclass=ABCMeta):  # FIXME: Rename to Generator
     """Toolkit: Abstract base class"""
 
+    _is_abstract: bool = True  # Set for each subclass when registered
+
     def __init__(self, name: str, required_vars: Union[Set[str], None] = None) -> None:
         self.name: str = "toolkit_" + name  # name
         self.required_vars: Set[str] = (
@@ -136,7 +162,9 @@ class Toolkit(metaclass=ABCMeta):  # FIXME: Rename to Generator
     @staticmethod
     @abstractmethod
     def is_supported() -> bool:
-        """Return True if Toolkit is supported by current platform"""
+        """Return True if Toolkit is supported by current platform
+        Result is constant for the process and may be cached
+        """
         raise NotImplementedError
 
     def is_instance_supported(self) -> bool:
@@ -158,12 +186,12 @@ class Toolkit(metaclass=ABCMeta):  # FIXME: Rename to Generator
         return ""
 
     @staticmethod
-    def _add_arguments(prefix: str, parser: _ArgumentGroup) -> None:
+    def _add_arguments(prefix: str, parser: "_ArgumentGroup") -> None:
         """Add Toolkit specific arguments to parser (check if already defined)"""
         return
 
     @classmethod
-    def _from_args(cls, prefix: str, args: Union[Namespace, None]) -> "Toolkit":
+    def _from_args(cls, prefix: str, args: Union["Namespace", None]) -> "Toolkit":
         """Parse arguments from argument-parser and construct Toolkit for generation
         Only called from CLI if _get_argument_prefix return Non-empty string
         """
@@ -458,6 +486,7 @@ class BatScriptToolkit(ScriptToolkit):
 
     @override
     @staticmethod
+    @lru_cache(maxsize=None)
     def is_supported() -> bool:
         return platform.system() == "Windows"
 
@@ -481,6 +510,7 @@ class ShellScriptToolkit(ScriptToolkit):
 
     @override
     @staticmethod
+    @lru_cache(maxsize=None)
     def is_supported() -> bool:
         return platform.system() != "Windows"
 
@@ -9,7 +9,7 @@ from collections import UserDict
 from enum import Enum
 from functools import total_ordering
 from tempfile import TemporaryDirectory
-from typing import Any, Dict, List, Sequence, Set, TypeVar, Union
+from typing import Any, Dict, List, Sequence, Set, Tuple, TypeVar, Union
 
 VersionType = TypeVar("VersionType", bound="Version")
 EnvDictType = TypeVar("EnvDictType", bound="EnvDict")
@@ -85,7 +85,9 @@ class SingletonABCMeta(ABCMeta):
 
 @total_ordering
 class Version(Sequence[int]):
-    parts: List[int]
+    # Immutable parts with the hash computed once, versions are used in sets and dicts
+    __slots__ = ("parts", "_hash")
+    parts: Tuple[int, ...]
 
     def __init__(
         self,
@@ -94,30 +96,31 @@ class Version(Sequence[int]):
         patch: int = -1,
         revision: int = -1,
     ) -> None:
-        self.parts = []
+        parts: List[int] = []
         if val is None:
-            return
-
-        if isinstance(val, Version):
-            self.parts = val.parts
+            pass
+        elif isinstance(val, Version):
+            parts = list(val.parts)
         elif isinstance(val, int):
             major: int = val
             for v in [major, minor, patch, revision]:
                 if v < 0:
                     break
-                self.parts.append(v)
+                parts.append(v)
         elif isinstance(val, str):
             raise ValueError(
                 f"Initialization from string needs to go through Version.make: {val}"
             )
-        elif isinstance(val, list):
+        elif isinstance(val, (list, tuple)):
             for i in range(min(4, len(val))):
                 ival = int(val[i])
                 if ival < 0:
                     break
-                self.parts.append(ival)
+                parts.append(ival)
         else:
             raise ValueError(f"Initialization from unsupported type: {type(val)}")
+        self.parts = tuple(parts)
+        self._hash = hash(self.parts)
 
     @classmethod
     def make(
@@ -207,7 +210,7 @@ class Version(Sequence[int]):
         return False
 
     def __hash__(self) -> int:
-        return hash(self.parts)
+        return self._hash
 
     def __len__(self) -> int:
         return len(self.parts)
@@ -221,7 +224,7 @@ class Version(Sequence[int]):
         return self.string()
 
     def __repr__(self) -> str:
-        return f"Version ({str(self.parts)})"
+        return f"Version ({str(list(self.parts))})"
 
     def __lt__(self, other: Any) -> bool:
         return self.parts_lt(other, True)  # Full comparison
@@ -416,7 +419,7 @@ class VersionSpec:
             opstr = m.group(1)
             ver = Version.make(m.group(2))
             if opstr == "range":
-                next = ver.parts.copy()
+                next = list(ver.parts)
                 next[len(next) - 1] += 1
                 ver2 = Version(next)
                 return cls(ver, VersionOp.GTE, ver2, VersionOp.LT)
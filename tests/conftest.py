@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _isolate_cache(monkeypatch, tmp_path) -> None:
+    """Keep scan and probe caches out of the user's cache directory"""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.delenv("CMAKE_PRESETS_NOCACHE", raising=False)
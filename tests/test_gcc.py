@@ -0,0 +1,346 @@
+#!/usr/bin/python3
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from cmake_presets.gcc import (
+    _PROBED,
+    GCC,
+    GCCToolkit,
+    _cache_file,
+    _load_cache,
+    _load_snapshot,
+    _save_cache,
+    _save_snapshot,
+    _scan_hint,
+    _scandir,
+    re_bin,
+    re_version,
+)
+from cmake_presets.util import Version
+
+
+def _make_exec(path) -> None:
+    os.chmod(str(path), 0o700)  # Owner only is enough for the executable check
+
+
+@pytest.mark.parametrize(
+    "filename,groups",
+    [
+        ("gcc", (None, "gcc", None)),
+        ("g++", (None, "g++", None)),
+        ("gfortran", (None, "gfortran", None)),
+        ("gcc-7", (None, "gcc", "-7")),
+        ("g++-8.2.0", (None, "g++", "-8.2.0")),
+        ("x86_64-pc-linux-gnu-gcc", ("x86_64-pc-linux-gnu-", "gcc", None)),
+        (
+            "x86_64-pc-linux-gnu-gfortran-8.2.0",
+            ("x86_64-pc-linux-gnu-", "gfortran", "-8.2.0"),
+        ),
+        ("x86_64-redhat-linux-g++", ("x86_64-redhat-linux-", "g++", None)),
+        ("gcc-ar", None),
+        ("x86_64-linux-gnu-gcc-nm-12", None),
+        ("c89-gcc", None),
+        ("gcc\n", None),
+        ("clang", None),
+    ],
+)
+def test_match_binary_names(filename, groups) -> None:
+    m = re_bin.match(filename)
+    if groups is None:
+        assert m is None
+    else:
+        assert m is not None
+        assert m.group(1, 2, 3) == groups
+
+
+@pytest.mark.parametrize(
+    "verstr,valid",
+    [
+        ("4.8.5", True),
+        ("12.2.0", True),
+        ("8.2.0.1", True),
+        ("12", False),
+        ("12.2", False),
+        ("1.2.3.4.5", False),
+        ("12.2.0-14", False),
+        ("", False),
+    ],
+)
+def test_match_version_output(verstr, valid) -> None:
+    assert bool(re_version.match(verstr)) == valid
+
+
+def test_scandir_skips_non_executable(tmp_path) -> None:
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    for fn, mode in (("gcc-7", 0o700), ("g++-7", 0o600)):
+        (bindir / fn).write_text("")
+        os.chmod(str(bindir / fn), mode)
+    found = {}
+    _scandir(str(tmp_path), dest=found)
+    assert found == {str(bindir): {"None-7": ["gcc-7", "", ""]}}
+
+
+@pytest.mark.parametrize(
+    "subdir",
+    [
+        "dev/gcc-13/bin",
+        "dev/toolchains/gcc/bin",
+        "src/gcc-12/install/bin",
+        "lib/gcc-12/bin",
+    ],
+)
+def test_scandir_finds_user_installs(tmp_path, subdir) -> None:
+    bindir = tmp_path / subdir
+    bindir.mkdir(parents=True)
+    (bindir / "gcc").write_text("")
+    _make_exec(bindir / "gcc")
+    found = {}
+    _scandir(str(tmp_path), dest=found)
+    assert list(found) == [str(bindir)]
+
+
+def test_binary_paths() -> None:
+    obj = GCC("/opt/gcc/bin")
+    obj.set_binaries("gcc-7", "g++-7", None)
+    assert obj.gcc_path() == os.path.join("/opt/gcc/bin", "gcc-7")
+    assert obj.gxx_path() == os.path.join("/opt/gcc/bin", "g++-7")
+    assert obj.gfortran_path() == ""
+
+
+@pytest.mark.parametrize(
+    "ver,expected",
+    [
+        ("8", []),
+        ("8.2", ["8.2.0"]),
+        ("8.2.0", ["8.2.0"]),
+        ("8.2.0.0", ["8.2.0"]),
+        ("range8", ["8.3.1", "8.2.0"]),
+        (">=8.3.0", ["9.1.0", "8.3.1"]),
+    ],
+)
+def test_filter_version(ver, expected) -> None:
+    products = []
+    for verstr in ("9.1.0", "8.3.1", "8.2.0"):
+        obj = GCC("/opt/gcc/bin")
+        obj.set_binaries("gcc", "g++", None)
+        obj.version = Version.make(verstr)
+        products.append(obj)
+    toolkit = GCCToolkit(ver=ver)
+    assert [str(p.version) for p in toolkit._filter(products)] == expected
+
+
+def test_scan_hint(tmp_path, monkeypatch) -> None:
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    for fn in ("gcc-8", "g++-8"):
+        (bindir / fn).write_text("")
+        _make_exec(bindir / fn)
+    monkeypatch.delenv("CMAKE_PRESETS_GCC_CC", raising=False)
+    monkeypatch.setenv("CMAKE_PRESETS_GCC_ROOT", str(tmp_path))
+    assert _scan_hint() == {str(bindir): {"None-8": ["gcc-8", "g++-8", ""]}}
+
+    monkeypatch.setenv("CMAKE_PRESETS_GCC_CC", str(bindir / "gcc-8"))
+    monkeypatch.setenv("CMAKE_PRESETS_GCC_FC", "/elsewhere/gfortran-8")
+    assert _scan_hint() == {str(bindir): {"hint": ["gcc-8", "", ""]}}
+
+
+@pytest.mark.parametrize("workers", [0, 4])
+def test_scandir_symlinked_dirs_once(tmp_path, workers) -> None:
+    bindir = tmp_path / "real" / "bin"
+    bindir.mkdir(parents=True)
+    (bindir / "gcc").write_text("")
+    _make_exec(bindir / "gcc")
+    os.symlink(str(tmp_path / "real"), str(tmp_path / "link"))
+    os.symlink(str(tmp_path), str(bindir / "loop"))
+    found = {}
+    if workers:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            _scandir([str(tmp_path)], dest=found, executor=executor)
+    else:
+        _scandir(str(tmp_path), dest=found)
+    assert len(found) == 1
+    assert list(found.values()) == [{"NoneNone": ["gcc", "", ""]}]
+
+
+@pytest.mark.parametrize(
+    "names,probes",
+    [
+        (("x86_64-pc-linux-gnu-gcc-8.2.0", "x86_64-pc-linux-gnu-g++-8.2.0"), 1),
+        (("gcc-8.2.0", "g++-8.2.0"), 2),
+        (("x86_64-pc-linux-gnu-gcc-8", "x86_64-pc-linux-gnu-g++-8"), 2),
+    ],
+)
+def test_set_binaries_trusts_full_names(tmp_path, monkeypatch, names, probes) -> None:
+    probed = []
+
+    def probe_bin(fn):
+        probed.append(fn)
+        return "8.2.0", "x86_64-pc-linux-gnu"
+
+    monkeypatch.setattr(GCC, "_probe_bin", staticmethod(probe_bin))
+    for fn in names:
+        (tmp_path / fn).write_text(fn)
+        _make_exec(tmp_path / fn)
+    obj = GCC(str(tmp_path))
+    assert obj.set_binaries(names[0], names[1], None, test=True, trust_names=True)
+    assert obj.gxx == names[1]
+    assert str(obj.version) == "8.2.0"
+    assert len(probed) == probes
+
+
+@pytest.mark.parametrize("cxx", ["typo++", "x86_64-pc-linux-gnu-g++-8.2.0"])
+def test_hinted_siblings_probed(tmp_path, monkeypatch, cxx) -> None:
+    def probe_bin(fn):
+        return "8.2.0", "x86_64-pc-linux-gnu"
+
+    monkeypatch.setattr(GCC, "_probe_bin", staticmethod(probe_bin))
+    gcc = tmp_path / "x86_64-pc-linux-gnu-gcc-8.2.0"
+    gcc.write_text("")
+    _make_exec(gcc)
+    monkeypatch.setenv("CMAKE_PRESETS_GCC_CC", str(gcc))
+    monkeypatch.setenv("CMAKE_PRESETS_GCC_CXX", str(tmp_path / cxx))  # Missing
+    products = GCC.scan()
+    assert [p.gcc for p in products] == [gcc.name]
+    assert not products[0].gxx
+
+
+def test_probe_found_skips_other_versions(tmp_path, monkeypatch) -> None:
+    probed = []
+
+    def probe_bin(fn):
+        probed.append(os.path.basename(fn))
+        return os.path.basename(fn)[4:], "x86_64-pc-linux-gnu"
+
+    monkeypatch.setattr(GCC, "_probe_bin", staticmethod(probe_bin))
+    monkeypatch.setattr("cmake_presets.gcc._load_cache", lambda: {})
+    monkeypatch.setattr("cmake_presets.gcc._save_cache", lambda cache: None)
+    found = {}
+    for ver in ("7.1.0", "8.2.0", "8.3.1"):
+        bindir = tmp_path / ver
+        bindir.mkdir()
+        (bindir / f"gcc-{ver}").write_text(ver)
+        found[str(bindir)] = {ver: [f"gcc-{ver}", "", ""]}
+    products = GCC._probe_found(found, GCCToolkit(ver="range8").version)
+    assert sorted(str(p.version) for p in products) == ["8.2.0", "8.3.1"]
+    assert sorted(probed) == ["gcc-8.2.0", "gcc-8.3.1"]
+
+
+def test_snapshot_invalidated_by_dir_change(tmp_path, monkeypatch) -> None:
+    root = tmp_path / "root"
+    bindir = root / "opt" / "bin"
+    bindir.mkdir(parents=True)
+    (bindir / "gcc").write_text("")
+    _make_exec(bindir / "gcc")
+    found, listed, bins = {}, {}, {}
+    _scandir(str(root), dest=found, listed=listed, bins=bins)
+    assert sorted(listed) == [str(root), str(root / "opt"), str(bindir)]
+
+    _save_snapshot([str(root)], listed, bins, found)
+    assert _load_snapshot([str(root)]) == found
+    assert _load_snapshot([str(root), str(tmp_path)]) is None
+
+    monkeypatch.setenv("CMAKE_PRESETS_NOCACHE", "1")
+    assert _load_snapshot([str(root)]) is None
+    monkeypatch.delenv("CMAKE_PRESETS_NOCACHE")
+
+    (bindir / "g++").write_text("")
+    os.utime(str(bindir), ns=(0, 0))  # mtime resolution may hide the change
+    assert _load_snapshot([str(root)]) is None
+
+
+@pytest.mark.parametrize("change", ["chmod", "rewrite"])
+def test_snapshot_invalidated_by_binary_change(tmp_path, change) -> None:
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    for fn in ("gcc", "g++"):
+        (bindir / fn).write_text("")
+    _make_exec(bindir / "gcc")
+    os.chmod(str(bindir / "g++"), 0o600)  # Not executable, so not found
+    found, listed, bins = {}, {}, {}
+    _scandir(str(bindir), dest=found, listed=listed, bins=bins)
+    assert found == {str(bindir): {"NoneNone": ["gcc", "", ""]}}
+    _save_snapshot([str(bindir)], listed, bins, found)
+    dir_mtime = os.stat(str(bindir)).st_mtime_ns
+
+    if change == "chmod":
+        _make_exec(bindir / "g++")
+    else:
+        (bindir / "gcc").write_text("#!/bin/sh\n")
+        os.utime(str(bindir / "gcc"), ns=(1, 1))  # mtime resolution
+    os.utime(str(bindir), ns=(dir_mtime, dir_mtime))  # Directory unchanged
+    assert _load_snapshot([str(bindir)]) is None
+
+
+def test_nocache_skips_write(tmp_path, monkeypatch) -> None:
+    fn = tmp_path / "gcc"
+    fn.write_text("")
+    cache = {str(fn): [0, 0, "8.2.0", "x86_64-pc-linux-gnu"]}
+    monkeypatch.setenv("CMAKE_PRESETS_NOCACHE", "1")
+    _save_cache(cache)
+    assert not os.path.exists(_cache_file())
+    monkeypatch.delenv("CMAKE_PRESETS_NOCACHE")
+    _save_cache(cache)
+    assert _load_cache() == cache
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Uses a shell script")
+def test_probe_timeout(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr("cmake_presets.gcc._PROBE_TIMEOUT", 0.1)
+    fn = tmp_path / "gcc-hang"
+    fn.write_text("#!/bin/sh\nsleep 5\n")
+    _make_exec(fn)
+    cache = {}
+    assert not GCC(str(tmp_path)).test_bin(fn.name, cache)
+    assert str(fn) not in cache  # May be a slow GCC, probe again next time
+    assert not any(key[1] == fn.stat().st_ino for key in _PROBED)
+
+    probes = []
+
+    def probe_bin(fn):
+        probes.append(fn)
+        return "8.2.0", "x86_64-pc-linux-gnu"
+
+    monkeypatch.setattr(GCC, "_probe_bin", staticmethod(probe_bin))
+    assert GCC(str(tmp_path)).test_bin(fn.name, cache)
+    assert probes == [str(fn)]
+    assert cache[str(fn)][2:] == ["8.2.0", "x86_64-pc-linux-gnu"]
+
+
+@pytest.mark.parametrize(
+    "major_below,best,probes",
+    [
+        (99, "9.1.0", ["gcc", "gcc-9.1.0"]),
+        (9, "8.2.0", ["gcc", "gcc-8.2.0", "gcc-9.1.0"]),
+        (4, None, ["gcc", "gcc-7.1.0", "gcc-8.2.0", "gcc-9.1.0"]),
+    ],
+)
+def test_probe_found_select_stops_early(
+    tmp_path, monkeypatch, major_below, best, probes
+) -> None:
+    probed = []
+
+    def probe_bin(fn):
+        probed.append(os.path.basename(fn))
+        ver = os.path.basename(fn).split("-")[-1]
+        return ver if "." in ver else "4.8.5", "x86_64-pc-linux-gnu"
+
+    def select(products):
+        return [p for p in products if p.version.major < major_below]
+
+    monkeypatch.setattr(GCC, "_probe_bin", staticmethod(probe_bin))
+    monkeypatch.setattr("cmake_presets.gcc._load_cache", lambda: {})
+    monkeypatch.setattr("cmake_presets.gcc._save_cache", lambda cache: None)
+    found = {}
+    for name in ("gcc-7.1.0", "gcc-9.1.0", "gcc-8.2.0", "gcc"):
+        bindir = tmp_path / name
+        bindir.mkdir()
+        (bindir / name).write_text(name)
+        found[str(bindir)] = {name: [name, "", ""]}
+    selected = select(GCC._probe_found(found, select=select))
+    found_best = max(selected, key=GCC.sort_key, default=None)
+    assert (str(found_best.version) if found_best else None) == best
+    assert sorted(probed) == probes
@@ -0,0 +1,178 @@
+#!/usr/bin/python3
+
+import os
+
+import pytest
+from cmake_presets.msvc import (
+    MSVC,
+    BuildTool,
+    MSVCToolkit,
+    build_tools_version,
+    re_build_tools,
+)
+from cmake_presets.util import Version, VersionOp, VersionSpec
+
+
+@pytest.mark.parametrize(
+    "val,spec",
+    [
+        (
+            "v141",
+            VersionSpec(Version(14, 10), VersionOp.GTE, Version(14, 20), VersionOp.LT),
+        ),
+        (
+            "v143",
+            VersionSpec(Version(14, 30), VersionOp.GTE, Version(14, 40), VersionOp.LT),
+        ),
+        ("14.20", VersionSpec(Version(14, 20), VersionOp.EQ)),
+        pytest.param("v140", None, marks=pytest.mark.xfail(raises=ValueError)),
+    ],
+)
+def test_build_tools_version(val, spec) -> None:
+    assert build_tools_version(val) == spec
+
+
+@pytest.mark.parametrize(
+    "name,match",
+    [
+        ("14.20.27508", True),
+        ("14.29", False),
+        ("14.20.27508.1", False),
+        ("14.20.x", False),
+        ("14.20.27508\n", False),
+    ],
+)
+def test_re_build_tools(name, match) -> None:
+    assert bool(re_build_tools.match(name)) == match
+
+
+def test_build_tool_targets(tmp_path) -> None:
+    for host, target in [("Hostx64", "x64"), ("Hostx64", "x86"), ("Hostx86", "x86")]:
+        os.makedirs(str(tmp_path / "bin" / host / target))
+    (tmp_path / "bin" / "Hostx64" / "cl.exe").write_text("")
+    tool = BuildTool(str(tmp_path), Version(14, 20))
+    assert not tool.x64_tools  # Scanned on first use
+    assert sorted(tool.tool_names()) == ["x64", "x64_x86", "x86"]
+    assert BuildTool(str(tmp_path / "missing"), Version(14, 20)).tool_names() == []
+
+
+def test_scan_build_tools(tmp_path) -> None:
+    kitdir = tmp_path / "VC" / "Tools" / "MSVC"
+    for name in ("14.20.27508", "14.29.30133", "notaversion", "14.29"):
+        os.makedirs(str(kitdir / name / "bin" / "Hostx64" / "x64"))
+    (kitdir / "14.30.0").write_text("")  # Not a directory
+    msvc = MSVC()
+    msvc.installDir = str(tmp_path)
+    MSVC._scan_build_tools(msvc)
+    assert [str(tool.version) for tool in msvc.vcBuildTools] == [
+        "14.29.30133",
+        "14.20.27508",
+    ]
+
+
+def test_scan_products_cached(monkeypatch) -> None:
+    scans = []
+
+    def scan_vs_installs():
+        scans.append(1)
+        msvc = MSVC()
+        msvc.vcBuildTools = [
+            BuildTool("", Version(14, 29)),
+            BuildTool("", Version(14, 20)),
+        ]
+        return [msvc]
+
+    monkeypatch.setattr("cmake_presets.msvc._IS_WINDOWS", True)
+    monkeypatch.setattr(MSVC, "_scan_vs_installs", staticmethod(scan_vs_installs))
+    monkeypatch.setattr(MSVC, "_scan_build_tools", staticmethod(lambda msvc: None))
+    MSVC.invalidate_cache()
+    first = MSVC.scan_products()
+    first.clear()
+    second = MSVC.scan_products()
+    assert len(second) == 1
+    assert second[0] is MSVC.scan_products()[0]
+    assert len(scans) == 1
+    MSVC.scan_products(force=True)
+    assert len(scans) == 2
+    MSVC.invalidate_cache()
+
+
+def test_filter_keeps_scanned(monkeypatch) -> None:
+    msvc = MSVC()
+    msvc.productVersion = Version(2019)
+    msvc.vcBuildTools = [
+        BuildTool("", Version(14, 29, 30133)),
+        BuildTool("", Version(14, 20, 27508)),
+    ]
+    monkeypatch.setattr(MSVC, "scan_products", staticmethod(lambda: [msvc]))
+    toolkit = MSVCToolkit(tools="14.20.27508")
+    for _ in range(2):
+        assert toolkit.scan_select()
+        assert [str(t.version) for t in toolkit._found[0].vcBuildTools] == [
+            "14.20.27508"
+        ]
+    assert len(msvc.vcBuildTools) == 2
+
+
+@pytest.mark.parametrize(
+    "product_id,valid",
+    [
+        ("Microsoft.VisualStudio.Product.Professional", True),
+        ("Microsoft.VisualStudio.Product.BuildTools", True),
+        ("microsoft.visualstudio.product.enterprise.extra", True),
+        ("Microsoft.VisualStudio.Product.TeamExplorer", False),
+        ("Microsoft.VisualStudio.Product.", False),
+        ("Microsoft.VisualStudio.Workload.Professional", False),
+    ],
+)
+def test_create_product_id(product_id, valid) -> None:
+    assert (MSVC.create({"productId": product_id}) is not None) == valid
+
+
+@pytest.mark.parametrize(
+    "year,complete,valid",
+    [
+        ("2017", True, True),
+        ("2022", True, True),
+        ("2022", False, False),
+        ("2015", True, False),
+        ("2019.1", True, False),
+    ],
+)
+def test_validate_year(tmp_path, caplog, year, complete, valid) -> None:
+    msvc = MSVC.create(
+        {
+            "productId": "Microsoft.VisualStudio.Product.Community",
+            "instanceId": "9bfa93d9",
+            "installationPath": str(tmp_path),
+            "displayName": "Visual Studio Community",
+            "isComplete": complete,
+            "catalog": {
+                "productLineVersion": year,
+                "productDisplayVersion": "16.11.29",
+                "buildVersion": "16.11.33927.289",
+            },
+        }
+    )
+    assert msvc.isValid == valid
+    # Rejected products are listed too, with their versions
+    assert msvc.displayVersion == Version(16, 11, 29)
+    assert msvc.fullVersion == Version(16, 11, 33927, 289)
+    with caplog.at_level("INFO", logger="cmake_presets.msvc"):
+        msvc.print(list_buildtools=False)
+    assert "Visual Studio Community - 16.11.29" in caplog.text
+
+
+def test_scan_products_build_tools(monkeypatch, tmp_path) -> None:
+    products = []
+    for name in ("2019", "2022"):
+        os.makedirs(str(tmp_path / name / "VC" / "Tools" / "MSVC" / "14.20.27508"))
+        msvc = MSVC()
+        msvc.installDir = str(tmp_path / name)
+        products.append(msvc)
+
+    monkeypatch.setattr("cmake_presets.msvc._IS_WINDOWS", True)
+    monkeypatch.setattr(MSVC, "_scan_vs_installs", staticmethod(lambda: products))
+    scanned = MSVC.scan_products(force=True)
+    MSVC.invalidate_cache()
+    assert [len(msvc.vcBuildTools) for msvc in scanned] == [1, 1]
@@ -0,0 +1,183 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from cmake_presets.oneapi import OneAPI, OneAPIToolkit
+from cmake_presets.util import Version, VersionSpec
+
+linux_only = pytest.mark.skipif(sys.platform != "linux", reason="Linux layout")
+
+
+def make_oneapi(root, layout) -> None:
+    """Fake oneAPI tree, layout maps component/version to files below it"""
+    for comp_ver, files in layout.items():
+        for f in files + ["env/vars.sh"]:
+            path = root / comp_ver / f
+            os.makedirs(str(path.parent), exist_ok=True)
+            path.write_text("")
+
+
+@linux_only
+def test_scan_versions(monkeypatch, tmp_path) -> None:
+    monkeypatch.delenv("ONEAPI_ROOT", raising=False)
+    make_oneapi(
+        tmp_path,
+        {
+            "compiler/2021.3.0": ["linux/bin/intel64/ifort", "linux/bin/ifx"],
+            "compiler/2024.0": ["bin/ifx"],
+            "mkl/2021.3.0": [],
+        },
+    )
+    (tmp_path / "compiler" / "latest").mkdir()
+    (tmp_path / "mkl" / "2022.1.0").write_text("")  # Not a directory
+
+    products = OneAPI.scan(str(tmp_path))
+    products = [p for p in products if p.dir == str(tmp_path)]
+    assert [str(p.version) for p in products] == ["2024.0", "2021.3.0"]
+    new, old = products
+    assert new.ifx == str(tmp_path / "compiler" / "2024.0" / "bin" / "ifx")
+    assert not new.ifort
+    assert list(old.components) == ["compiler", "mkl"]
+    assert old.ifort.endswith(os.path.join("linux", "bin", "intel64", "ifort"))
+    assert old.ifx.endswith(os.path.join("linux", "bin", "ifx"))
+
+
+@linux_only
+def test_scan_cached(monkeypatch, tmp_path) -> None:
+    monkeypatch.delenv("ONEAPI_ROOT", raising=False)
+    make_oneapi(tmp_path, {"mkl/2021.3.0": []})
+    first = OneAPI.scan(str(tmp_path))
+    make_oneapi(tmp_path, {"mkl/2022.1.0": []})
+    assert len(OneAPI.scan(str(tmp_path))) == len(first)
+    monkeypatch.setenv("ONEAPI_ROOT", str(tmp_path / "other"))
+    assert len(OneAPI.scan(str(tmp_path))) == len(first) + 1
+    assert len(OneAPI.scan(str(tmp_path), force=True)) == len(first) + 1
+    OneAPI.invalidate_cache()
+
+
+@pytest.mark.parametrize(
+    "components,found",
+    [("all", ["2021.3.0"]), ("compiler", ["2024.0", "2021.3.0"]), ("mkl", [])],
+)
+def test_filter_components(components, found) -> None:
+    products = []
+    for ver, comps in [("2024.0", ["compiler"]), ("2021.3.0", ["compiler", "mkl"])]:
+        product = OneAPI("")
+        product.version = Version.make(ver)
+        product.ifx = "ifx"
+        product.components = {c: f"{c}/env/vars.sh" for c in comps}
+        products.append(product)
+    if components == "mkl":
+        products[1].components.pop("compiler")  # mkl implies compiler unless none
+    toolkit = OneAPIToolkit(components=components)
+    assert [str(p.version) for p in toolkit._filter(products)] == found
+
+
+@pytest.mark.parametrize(
+    "fortran,found",
+    [
+        ("any", ["2024.0", "2023.0", "2021.3.0"]),
+        ("ifx", ["2024.0", "2023.0"]),
+        ("ifort", ["2023.0", "2021.3.0"]),
+        ("none", ["2024.0", "2023.0", "2021.3.0", "2020.1"]),
+    ],
+)
+def test_filter_fortran(fortran, found) -> None:
+    products = []
+    for ver, ifx, ifort in [
+        ("2024.0", "ifx", ""),
+        ("2023.0", "ifx", "ifort"),
+        ("2021.3.0", "", "ifort"),
+        ("2020.1", "", ""),
+    ]:
+        product = OneAPI("")
+        product.version = Version.make(ver)
+        product.ifx = ifx
+        product.ifort = ifort
+        product.components = {"compiler": "compiler/env/vars.sh"}
+        products.append(product)
+    toolkit = OneAPIToolkit(fortran=fortran, components="compiler")
+    assert [str(p.version) for p in toolkit._filter(products)] == found
+
+
+@linux_only
+def test_env_script() -> None:
+    product = OneAPI("")
+    product.ifort = "/oneapi/compiler/bin/ifort"
+    product.components = {
+        "compiler": "/oneapi/compiler/env/vars.sh",
+        "mkl": "/oneapi/mkl/env/vars.sh",
+    }
+    toolkit = OneAPIToolkit(fortran="ifort")
+    toolkit._found = [product]
+    assert toolkit._get_env_script() == (
+        "#!/bin/bash\n"
+        'source "/oneapi/compiler/env/vars.sh"\n'
+        'source "/oneapi/mkl/env/vars.sh"\n'
+        'export FC="/oneapi/compiler/bin/ifort"\n'
+    )
+
+
+@linux_only
+def test_scan_without_fortran(monkeypatch, tmp_path) -> None:
+    monkeypatch.delenv("ONEAPI_ROOT", raising=False)
+    make_oneapi(tmp_path, {"compiler/2024.0": ["bin/ifx"]})
+    product = OneAPI.scan(str(tmp_path), fortran=False)[0]
+    assert "compiler" in product.components
+    assert not product.ifx
+    assert OneAPI.scan(str(tmp_path))[0].ifx  # Not served from the scan without
+    assert OneAPI.scan(str(tmp_path), fortran=False)[0].ifx  # But the other way
+    OneAPI.invalidate_cache()
+
+
+@linux_only
+def test_scan_version(monkeypatch, tmp_path) -> None:
+    monkeypatch.delenv("ONEAPI_ROOT", raising=False)
+    make_oneapi(tmp_path, {"mkl/2021.3.0": [], "mkl/2022.1.0": []})
+    spec = VersionSpec.make("2022.1.0")
+    assert [str(p.version) for p in OneAPI.scan(str(tmp_path), version=spec)] == [
+        "2022.1.0"
+    ]
+    assert len(OneAPI.scan(str(tmp_path))) == 2  # Not served from the version scan
+    assert len(OneAPI.scan(str(tmp_path), version=spec)) == 1
+    OneAPI.invalidate_cache()
+
+
+def test_scan_threads_share_cache(monkeypatch, tmp_path) -> None:
+    scans = []
+
+    def scan(root_dir, fortran, version):
+        scans.append(root_dir)
+        time.sleep(0.05)  # Let the other threads miss the cache too
+        return []
+
+    monkeypatch.setattr(OneAPI, "_scan", staticmethod(scan))
+    OneAPI.invalidate_cache()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: OneAPI.scan(str(tmp_path)), range(4)))
+    OneAPI.invalidate_cache()
+    assert scans == [str(tmp_path)]
+
+
+@linux_only
+def test_toolkit_scan_complete(monkeypatch, tmp_path) -> None:
+    monkeypatch.delenv("ONEAPI_ROOT", raising=False)
+    make_oneapi(
+        tmp_path,
+        {"compiler/2021.3.0": ["bin/ifx"], "compiler/2024.0": ["bin/ifx"]},
+    )
+    OneAPI.invalidate_cache()
+    toolkit = OneAPIToolkit(
+        ver="2024.0", fortran="none", components="compiler", root_dir=str(tmp_path)
+    )
+    assert toolkit.scan_select()
+    assert not toolkit._found[0].ifx  # Compilers not needed
+    toolkit.scan()
+    products = [p for p in toolkit._scanned if p.dir == str(tmp_path)]
+    assert [str(p.version) for p in products] == ["2024.0", "2021.3.0"]
+    assert all(p.ifx for p in products)
+    OneAPI.invalidate_cache()
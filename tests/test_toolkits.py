@@ -1,5 +1,8 @@
 #!/usr/bin/python3
 
+import os
+import subprocess
+import sys
 from typing import Set
 
 import cmake_presets as cmp  # type: ignore
@@ -22,3 +25,29 @@ def test_toolkits_register(toolkit_names: Set[str]) -> None:
     for t in toolkits.keys():
         assert t in toolkit_names
     assert len(toolkits) == len(toolkit_names)
+
+
+@pytest.mark.parametrize(
+    "argv", [["-h"], ["help"], ["help", "version"], ["scan", "-h"]]
+)
+def test_cli_help_no_toolkit_imports(argv) -> None:
+    code = (
+        "import runpy, sys\n"
+        f"sys.argv = ['cmake_presets', *{argv!r}]\n"
+        "try:\n"
+        "    runpy.run_module('cmake_presets', run_name='__main__')\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print(sorted(m for m in ('gcc', 'msvc', 'oneapi')"
+        " if 'cmake_presets.' + m in sys.modules))\n"
+    )
+    src_dir = os.path.dirname(os.path.dirname(cmp.__file__))
+    env = dict(os.environ, PYTHONPATH=src_dir)
+    out = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code],
+        stdout=subprocess.PIPE,
+        env=env,
+        text=True,
+        check=True,
+    ).stdout
+    assert out.splitlines()[-1] == "[]"
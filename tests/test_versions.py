@@ -82,3 +82,18 @@ def test_match_version_specs(specstr, vertrue, verfalse) -> None:
         assert spec.matches(Version.make(vertrue))
     if verfalse:
         assert not spec.matches(Version.make(verfalse))
+
+
+def test_version_hash() -> None:
+    found = {Version(2, 1): "a", Version(2, 1, 0): "b"}
+    assert found[Version.make("2.1")] == "a"
+    assert found[Version.make("2.1.0")] == "b"
+    assert len({Version(8, 2, 0), Version.make("8.2.0")}) == 1
+
+
+def test_version_parts_immutable() -> None:
+    ver = Version([8, 2, 0])
+    assert ver.parts == (8, 2, 0)
+    assert hash(Version(ver)) == hash(ver)
+    with pytest.raises(AttributeError):
+        ver.extra = 1  # type: ignore